@@ -1,6 +1,10 @@
+from uuid import UUID
+
 from asgiref.sync import async_to_sync
 from celery import Celery
+from celery.schedules import crontab
 
+from .config import Config
 from .utility.mail_config import create_message, mail
 
 c_app = Celery()
@@ -12,3 +16,44 @@ def send_email(recipient: list[str], subject: str, body: str):
     message = create_message(recipient, subject, body)
     async_to_sync(mail.send_message)(message)
     print("Email sent")
+
+
+def _run_with_engine(job, *args):
+    """Run an async DB job from a worker.
+
+    Own engine: a worker process has no event loop shared with the app's pool.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    async def run():
+        bind = create_async_engine(Config.DATABASE_URL, poolclass=NullPool)
+        try:
+            return await job(bind, *args)
+        finally:
+            await bind.dispose()
+
+    return async_to_sync(run)()
+
+
+@c_app.task()
+def archive_messages():
+    from .messages.archive import archive_old_messages
+
+    _run_with_engine(archive_old_messages)
+
+
+# A missing row is retried with backoff (1s, 2s, 4s, ...) before giving up
+@c_app.task(autoretry_for=(LookupError,), retry_backoff=True, max_retries=6)
+def generate_media_variants(media_id: str):
+    from .media.services import generate_variants
+
+    _run_with_engine(generate_variants, UUID(media_id))
+
+
+c_app.conf.beat_schedule = {
+    "archive-messages": {
+        "task": "app.celery_task.archive_messages",
+        "schedule": crontab(hour=3, minute=0),
+    },
+}
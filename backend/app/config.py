@@ -31,6 +31,65 @@ class Settings(BaseSettings):
     BACKEND_URL: str
     MESSAGE_BOKER: str
 
+    # Realtime
+    NODE_ID: str | None = None
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_SLOW_CONSUMER_POLICY: str = "drop_oldest"  # drop_oldest | coalesce | disconnect
+    PRESENCE_DEBOUNCE_SECONDS: float = 5.0
+    WS_LEASE_TTL_SECONDS: float = 30.0
+    EVENT_LOG_MAXLEN: int = 1000
+    EVENT_LOG_TTL_SECONDS: int = 7 * 24 * 3600
+    EVENT_LOG_REPLAY_LIMIT: int = 500
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_POLL_SECONDS: float = 1.0
+
+    # Caches
+    DIRECT_CONV_CACHE_SIZE: int = 100_000
+    DIRECT_CONV_CACHE_TTL_SECONDS: int = 24 * 3600
+    FRIEND_CACHE_TTL_SECONDS: int = 24 * 3600
+    CONV_MEMBERS_CACHE_SIZE: int = 100_000
+    RECENT_MESSAGES_SIZE: int = 50
+    RECENT_MESSAGES_CONVERSATIONS: int = 10_000
+    RECENT_MESSAGES_TTL_SECONDS: int = 3600
+    RECENT_MESSAGES_PARTIAL_TTL_SECONDS: int = 60
+
+    # Inbox
+    INBOX_PREVIEW_LENGTH: int = 200
+    INBOX_PAGE_SIZE: int = 30
+    INBOX_CHANGES_LIMIT: int = 200
+    SEEN_BY_PREVIEW: int = 3
+    RECEIPTS_PAGE_SIZE: int = 50
+
+    # Read receipts
+    RECEIPT_FLUSH_SECONDS: float = 2.0
+    RECEIPT_FLUSH_BATCH: int = 1000
+
+    # Message partitions
+    MESSAGE_PARTITIONS_AHEAD: int = 3
+    MESSAGE_PARTITION_CHECK_SECONDS: float = 6 * 3600
+    MESSAGE_CLOCK_SKEW_SECONDS: int = 300
+
+    # Archive
+    ARCHIVE_DIR: str = str(BASE_DIR.parent / "archive")
+    ARCHIVE_AFTER_DAYS: int = 365
+    ARCHIVE_CHUNK_SIZE: int = 1000
+    ARCHIVE_CACHE_CHUNKS: int = 64
+
+    # Media
+    MEDIA_STORAGE: str = "local"
+    MEDIA_DIR: str = str(BASE_DIR.parent / "media")
+    MEDIA_BASE_URL: str = "/media"
+    MEDIA_MAX_BYTES: int = 20 * 1024 * 1024
+    MEDIA_MAX_PIXELS: int = 50_000_000
+
+    # Export
+    EXPORT_YIELD_PER: int = 1000
+    EXPORT_FLUSH_BYTES: int = 64 * 1024
+
+    # Search
+    SEARCH_PAGE_SIZE: int = 20
+    SEARCH_SNIPPET_LENGTH: int = 80
+
     model_config = SettingsConfigDict(env_file=ENV_PATH, extra="ignore")
 
 
@@ -0,0 +1,122 @@
+from uuid import UUID
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..config import Config
+from ..core.cache import LRUCache
+from ..core.model import Conversation, ConvParticipant, ConvReadState, ConvType
+from ..core.redis import redis_client
+from ..utility.uuid7 import uuid7
+from .inbox import add_members
+
+
+def direct_key(user_a: UUID, user_b: UUID) -> str:
+    """Canonical key of the direct conversation between two users."""
+    user_a, user_b = sorted((user_a, user_b))  # normalization
+    return f"{user_a}:{user_b}"
+
+
+class DirectConvCache:
+    """user pair -> direct conversation id, in process first, then Redis.
+
+    A pair always maps to the same conversation, so entries never need to
+    be invalidated.
+    """
+
+    def __init__(
+        self,
+        redis,
+        maxsize: int = Config.DIRECT_CONV_CACHE_SIZE,
+        ttl_seconds: int = Config.DIRECT_CONV_CACHE_TTL_SECONDS,
+    ):
+        self.redis = redis
+        self.ttl_seconds = ttl_seconds
+        self.local: LRUCache[str, UUID] = LRUCache(maxsize)
+
+    def _key(self, key: str):
+        return f"conv:direct:{key}"
+
+    async def get(self, key: str) -> UUID | None:
+        conv_id = self.local.get(key)
+        if conv_id is not None:
+            return conv_id
+
+        cached = await self.redis.get(self._key(key))
+        if cached is None:
+            return None
+
+        conv_id = UUID(cached)
+        self.local.set(key, conv_id)
+        return conv_id
+
+    async def set(self, key: str, conv_id: UUID):
+        self.local.set(key, conv_id)
+        await self.redis.set(self._key(key), str(conv_id), ex=self.ttl_seconds)
+
+
+direct_conv_cache = DirectConvCache(redis_client)
+
+
+async def find_direct_conv(
+    session: AsyncSession, user_a: UUID, user_b: UUID
+) -> UUID | None:
+    key = direct_key(user_a, user_b)
+
+    conv_id = await direct_conv_cache.get(key)
+    if conv_id is not None:
+        return conv_id
+
+    conv_id = await session.scalar(
+        select(Conversation.id).where(Conversation.direct_key == key)
+    )
+    if conv_id is not None:
+        await direct_conv_cache.set(key, conv_id)
+    return conv_id
+
+
+async def get_or_create_direct_conv(
+    session: AsyncSession, user_a: UUID, user_b: UUID
+) -> tuple[UUID, bool]:
+    """Id of the pair's direct conversation, and whether it was just created.
+
+    Concurrent first messages race on the unique direct_key: the loser's
+    insert does nothing and it reads the winner's row instead.
+    """
+    conv_id = await find_direct_conv(session, user_a, user_b)
+    if conv_id is not None:
+        return conv_id, False
+
+    key = direct_key(user_a, user_b)
+    stmt = (
+        insert(Conversation)
+        .values(id=uuid7(), type=ConvType.direct, direct_key=key)
+        .on_conflict_do_nothing(index_elements=["direct_key"])
+        .returning(Conversation.id)
+    )
+    conv_id = await session.scalar(stmt)
+
+    if conv_id is None:
+        conv_id = await session.scalar(
+            select(Conversation.id).where(Conversation.direct_key == key)
+        )
+        await direct_conv_cache.set(key, conv_id)
+        return conv_id, False
+
+    session.add_all(
+        [
+            ConvParticipant(conv_id=conv_id, user_id=user_a),
+            ConvParticipant(conv_id=conv_id, user_id=user_b),
+            ConvReadState(conv_id=conv_id, user_id=user_a),
+            ConvReadState(conv_id=conv_id, user_id=user_b),
+        ]
+    )
+    await session.flush()
+    await add_members(session, conv_id, [user_a, user_b])
+    # Cached only once committed, see cache_created()
+    return conv_id, True
+
+
+async def cache_created(user_a: UUID, user_b: UUID, conv_id: UUID):
+    await direct_conv_cache.set(direct_key(user_a, user_b), conv_id)
@@ -0,0 +1,88 @@
+from uuid import UUID
+
+from sqlalchemy import case, func, literal_column, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..config import Config
+from ..core.model import Conversation, ConvReadState, Message, UserInbox
+
+# The user_inbox projection. Every helper only adds statements to the
+# caller's transaction, so the projection commits together with the change.
+# Each write stamps changed_xid with the writing transaction's id, which is
+# what GET /conversations/changes compares against a snapshot watermark,
+# together with convreadstate.changed_xid for other members' reads.
+
+CURRENT_XID = literal_column("pg_current_xact_id()::text::bigint")
+
+CURRENT_WATERMARK = "SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+
+
+def preview(message: Message) -> str:
+    return (message.content or "")[: Config.INBOX_PREVIEW_LENGTH]
+
+
+async def add_members(session: AsyncSession, conv_id: UUID, user_ids):
+    stmt = (
+        insert(UserInbox)
+        .values([{"user_id": uid, "conv_id": conv_id} for uid in user_ids])
+        .on_conflict_do_nothing(index_elements=["user_id", "conv_id"])
+    )
+    await session.exec(stmt)
+
+
+async def record_message(session: AsyncSession, message: Message):
+    """Move the conversation to the top of every member's inbox."""
+    stmt = (
+        update(UserInbox)
+        .where(UserInbox.conv_id == message.conv_id)
+        .values(
+            last_message_at=message.created_at,
+            last_message_id=message.id,
+            last_sender_id=message.sender_user_id,
+            last_message_preview=preview(message),
+            changed_xid=CURRENT_XID,
+            unread=case(
+                (UserInbox.user_id == message.sender_user_id, 0),
+                else_=UserInbox.unread + 1,
+            ),
+        )
+    )
+    await session.exec(stmt)
+
+
+async def mark_read(session: AsyncSession, readers: list[tuple[UUID, UUID]]):
+    """Recount unread for (conv_id, user_id) pairs from their stored read_seq."""
+    if not readers:
+        return
+
+    # Messages committed after read_seq was taken stay unread
+    unread = (
+        select(func.greatest(Conversation.last_seq - ConvReadState.read_seq, 0))
+        .where(
+            Conversation.id == UserInbox.conv_id,
+            ConvReadState.conv_id == UserInbox.conv_id,
+            ConvReadState.user_id == UserInbox.user_id,
+        )
+        .scalar_subquery()
+    )
+    # Only the readers' rows: the other members learn about the new seenBy
+    # from convreadstate.changed_xid (see changed_since) and the outbox
+    await session.exec(
+        update(UserInbox)
+        .where(tuple_(UserInbox.conv_id, UserInbox.user_id).in_(readers))
+        .values(unread=unread, changed_xid=CURRENT_XID)
+    )
+
+
+def changed_since(since: int):
+    """Filter for user_inbox rows whose conversation shows something new since the xid."""
+    read_moved = (
+        select(ConvReadState.conv_id)
+        .where(
+            ConvReadState.conv_id == UserInbox.conv_id,
+            ConvReadState.changed_xid >= since,
+        )
+        .exists()
+    )
+    return or_(UserInbox.changed_xid >= since, read_moved)
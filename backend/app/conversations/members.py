@@ -0,0 +1,63 @@
+from typing import NamedTuple
+from uuid import UUID
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..config import Config
+from ..core.cache import LRUCache
+from ..core.model import Conversation, ConvParticipant, ConvType
+from ..core.redis import redis_client
+
+
+class ConvMembers(NamedTuple):
+    type: ConvType
+    user_ids: frozenset[UUID]
+    version: str
+
+
+class ConvMembersCache:
+    """conv id -> type and member ids, kept in process.
+
+    conv:members:ver:{id} in Redis is bumped on every membership change; a
+    local entry is only used while its version is still the current one, so
+    a check costs one GET instead of the participant queries.
+    """
+
+    def __init__(self, redis, maxsize: int = Config.CONV_MEMBERS_CACHE_SIZE):
+        self.redis = redis
+        self.local: LRUCache[UUID, ConvMembers] = LRUCache(maxsize)
+
+    def _version_key(self, conv_id: UUID):
+        return f"conv:members:ver:{conv_id}"
+
+    async def get(self, session: AsyncSession, conv_id: UUID) -> ConvMembers | None:
+        version = await self.redis.get(self._version_key(conv_id)) or "0"
+
+        entry = self.local.get(conv_id)
+        if entry is not None and entry.version == version:
+            return entry
+
+        stmt = (
+            select(Conversation.type, ConvParticipant.user_id)
+            .join(ConvParticipant)
+            .where(Conversation.id == conv_id)
+        )
+        result = await session.exec(stmt)
+        rows = result.all()
+        if not rows:
+            return None
+
+        # Tagged with the version read before the query, so a change that
+        # lands in between makes the entry stale on the next call
+        entry = ConvMembers(rows[0][0], frozenset(uid for _, uid in rows), version)
+        self.local.set(conv_id, entry)
+        return entry
+
+    async def invalidate(self, conv_id: UUID):
+        """Call after the membership change is committed."""
+        self.local.pop(conv_id)
+        await self.redis.incr(self._version_key(conv_id))
+
+
+conv_members = ConvMembersCache(redis_client)
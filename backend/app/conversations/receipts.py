@@ -0,0 +1,205 @@
+import asyncio
+import logging
+from uuid import UUID
+
+from sqlalchemy.dialects.postgresql import insert
+
+from ..config import Config
+from ..core.model import ConvReadState, ConvType
+from ..core.redis import redis_client
+from ..core.session import AsyncSessionLocal
+from ..ws.outbox import add_conv_event, add_user_event, outbox_relay
+from .inbox import CURRENT_XID, mark_read
+from .members import conv_members
+
+logger = logging.getLogger(__name__)
+
+# receipts:pending is a hash of "{conv_id}:{user_id}" -> "{read_seq}:{message_id}",
+# the furthest read pointer reported since the last flush. A flush takes the
+# whole hash atomically, so every pointer is written by exactly one process.
+
+# KEYS: pending key
+# ARGV: field, read seq, message id
+MARK_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if current and tonumber(string.match(current, '^(%d+):')) >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2] .. ':' .. ARGV[3])
+return 1
+"""
+
+# KEYS: pending key
+TAKE_SCRIPT = """
+local items = redis.call('HGETALL', KEYS[1])
+redis.call('DEL', KEYS[1])
+return items
+"""
+
+PENDING_KEY = "receipts:pending"
+
+
+class ReadReceiptBuffer:
+    """Write-behind read pointers, flushed to Postgres in batched upserts.
+
+    Marking a conversation seen is a single Redis call that keeps only the
+    highest pointer per (conversation, user). Every flush interval the
+    buffered pointers become one upsert into convreadstate, one unread
+    recount and one read-message event per pointer that actually moved,
+    however many times the client reported it in between.
+    """
+
+    def __init__(
+        self,
+        redis,
+        flush_seconds: float = Config.RECEIPT_FLUSH_SECONDS,
+        batch_size: int = Config.RECEIPT_FLUSH_BATCH,
+    ):
+        self.redis = redis
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self._mark = redis.register_script(MARK_SCRIPT)
+        self._take = redis.register_script(TAKE_SCRIPT)
+        self._task: asyncio.Task | None = None
+
+    async def mark(self, conv_id: UUID, user_id: UUID, read_seq: int, message_id: UUID) -> bool:
+        """Buffer a read pointer. False if a further one is already pending."""
+        moved = await self._mark(
+            keys=[PENDING_KEY], args=[f"{conv_id}:{user_id}", read_seq, str(message_id)]
+        )
+        return bool(moved)
+
+    async def pending(self, conv_id: UUID, user_id: UUID) -> tuple[int, UUID] | None:
+        """The buffered (read_seq, message_id) not flushed yet, if any."""
+        value = await self.redis.hget(PENDING_KEY, f"{conv_id}:{user_id}")
+        if not value:
+            return None
+        read_seq, message_id = value.split(":")
+        return int(read_seq), UUID(message_id)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="read-receipts")
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        # Don't leave this process' last reports waiting for another node
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Read receipts final flush error: {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Read receipts flush error: {e}")
+
+    async def flush(self) -> int:
+        """Write the buffered pointers, returns how many moved."""
+        items = await self._take(keys=[PENDING_KEY])
+        if not items:
+            return 0
+
+        pointers = []
+        for field, value in zip(items[::2], items[1::2]):
+            conv_id, user_id = field.split(":")
+            read_seq, message_id = value.split(":")
+            pointers.append((UUID(conv_id), UUID(user_id), int(read_seq), UUID(message_id)))
+
+        moved = 0
+        for i in range(0, len(pointers), self.batch_size):
+            try:
+                moved += await self._write(pointers[i : i + self.batch_size])
+            except BaseException:
+                # Back into the buffer, merged with anything reported since
+                await self._restore(pointers[i:])
+                raise
+
+        if moved:
+            outbox_relay.notify()
+        return moved
+
+    async def _write(self, pointers: list[tuple[UUID, UUID, int, UUID]]) -> int:
+        async with AsyncSessionLocal() as session:
+            stmt = insert(ConvReadState).values(
+                [
+                    {
+                        "conv_id": conv_id,
+                        "user_id": user_id,
+                        "read_seq": read_seq,
+                        "last_message_id": message_id,
+                    }
+                    for conv_id, user_id, read_seq, message_id in pointers
+                ]
+            )
+            # Only pointers that move forward are written, and only those
+            # come back from RETURNING
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["conv_id", "user_id"],
+                set_={
+                    "read_seq": stmt.excluded.read_seq,
+                    "last_message_id": stmt.excluded.last_message_id,
+                    "changed_xid": CURRENT_XID,
+                },
+                where=stmt.excluded.read_seq > ConvReadState.read_seq,
+            ).returning(
+                ConvReadState.conv_id,
+                ConvReadState.user_id,
+                ConvReadState.read_seq,
+                ConvReadState.last_message_id,
+            )
+            result = await session.exec(stmt)
+            advanced = result.all()
+            if not advanced:
+                await session.commit()
+                return 0
+
+            await mark_read(session, [(row.conv_id, row.user_id) for row in advanced])
+
+            # ---------- Realtime events (outbox), one per moved pointer ----------
+            for conv_id, user_id, read_seq, message_id in advanced:
+                members = await conv_members.get(session, conv_id)
+                if not members:
+                    continue
+
+                payload = {
+                    "event": "read-message",
+                    "conv_id": str(conv_id),
+                    "last_message_id": str(message_id),
+                    "read_seq": read_seq,
+                    "seen_by": str(user_id),
+                }
+                if members.type == ConvType.group:
+                    add_conv_event(session, conv_id, payload, exclude=[user_id])
+                else:
+                    add_user_event(session, members.user_ids - {user_id}, payload)
+
+            await session.commit()
+            return len(advanced)
+
+    async def _restore(self, pointers: list[tuple[UUID, UUID, int, UUID]]):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for conv_id, user_id, read_seq, message_id in pointers:
+                await self._mark(
+                    keys=[PENDING_KEY],
+                    args=[f"{conv_id}:{user_id}", read_seq, str(message_id)],
+                    client=pipe,
+                )
+            await pipe.execute()
+
+
+read_receipts = ReadReceiptBuffer(redis_client)
@@ -0,0 +1,167 @@
+import logging
+from uuid import UUID
+
+from ..config import Config
+from ..core.model import Message
+from ..core.redis import redis_client
+from .schema import MessageResponse
+
+logger = logging.getLogger(__name__)
+
+# conv:recent:{id} is a ZSET of serialized MessageResponse items scored by
+# seq (one item per seq), holding the newest messages of the conversation. conv:recent:lru
+# scores the cached conversations by last use; past the limit the least
+# recently used ones are dropped. A conversation is only served from cache
+# once it is in the LRU set, which only a fill from the database does, so
+# write-throughs alone never make an incomplete window look complete.
+
+_NOW = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+"""
+
+# KEYS: conv key, lru key
+# ARGV: conv id
+# Reads don't extend the TTL: a window that missed a write-through only
+# lives until the TTL set by the last fill or push
+GET_SCRIPT = _NOW + """
+if not redis.call('ZSCORE', KEYS[2], ARGV[1]) then
+    return false
+end
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('ZREM', KEYS[2], ARGV[1])
+    return false
+end
+redis.call('ZADD', KEYS[2], now, ARGV[1])
+return redis.call('ZRANGE', KEYS[1], 0, -1)
+"""
+
+# KEYS: conv key, lru key
+# ARGV: conv id, size, ttl seconds, key prefix, max conversations,
+#       seq, item, seq, item...
+FILL_SCRIPT = _NOW + """
+for i = 6, #ARGV, 2 do
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], ARGV[i], ARGV[i])
+    redis.call('ZADD', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -(tonumber(ARGV[2]) + 1))
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('ZADD', KEYS[2], now, ARGV[1])
+local over = redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[5])
+if over > 0 then
+    local evicted = redis.call('ZPOPMIN', KEYS[2], over)
+    for i = 1, #evicted, 2 do
+        redis.call('DEL', ARGV[4] .. evicted[i])
+    end
+end
+return 1
+"""
+
+# KEYS: conv key, lru key
+# ARGV: conv id, size, ttl seconds, partial ttl seconds, seq, item
+PUSH_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], ARGV[5], ARGV[5])
+redis.call('ZADD', KEYS[1], ARGV[5], ARGV[6])
+redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -(tonumber(ARGV[2]) + 1))
+if redis.call('ZSCORE', KEYS[2], ARGV[1]) then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+elseif redis.call('TTL', KEYS[1]) < 0 then
+    -- Not cached yet: kept briefly so a fill racing with this send
+    -- still ends up with the message
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+end
+return 1
+"""
+
+KEY_PREFIX = "conv:recent:"
+LRU_KEY = "conv:recent:lru"
+
+
+class RecentMessagesCache:
+    def __init__(
+        self,
+        redis,
+        size: int = Config.RECENT_MESSAGES_SIZE,
+        max_conversations: int = Config.RECENT_MESSAGES_CONVERSATIONS,
+        ttl_seconds: int = Config.RECENT_MESSAGES_TTL_SECONDS,
+    ):
+        self.redis = redis
+        self.size = size
+        self.max_conversations = max_conversations
+        self.ttl_seconds = ttl_seconds
+        self._get = redis.register_script(GET_SCRIPT)
+        self._fill = redis.register_script(FILL_SCRIPT)
+        self._push = redis.register_script(PUSH_SCRIPT)
+
+    def _key(self, conv_id: UUID):
+        return f"{KEY_PREFIX}{conv_id}"
+
+    @staticmethod
+    def _dump(message: Message | MessageResponse) -> str:
+        return MessageResponse.model_validate(message).model_dump_json(by_alias=True)
+
+    async def latest(self, conv_id: UUID, limit: int) -> list[MessageResponse] | None:
+        """The newest `limit` messages, old -> new, or None if not cached."""
+        if limit > self.size:
+            return None
+
+        items = await self._get(keys=[self._key(conv_id), LRU_KEY], args=[str(conv_id)])
+        if not items:
+            return None
+
+        page = [MessageResponse.model_validate_json(item) for item in items[-limit:]]
+
+        # Only a gap-free run of seqs is a real page, and fewer than asked
+        # is only fine when it is the whole history
+        if page[-1].seq - page[0].seq != len(page) - 1:
+            return None
+        if len(page) < limit and page[0].seq != 1:
+            return None
+        return page
+
+    async def fill(self, conv_id: UUID, messages: list[Message]):
+        if not messages:
+            return
+
+        args = [
+            str(conv_id),
+            self.size,
+            self.ttl_seconds,
+            KEY_PREFIX,
+            self.max_conversations,
+        ]
+        for message in messages[-self.size:]:
+            args += [message.seq, self._dump(message)]
+
+        await self._fill(keys=[self._key(conv_id), LRU_KEY], args=args)
+
+    async def push(self, message: Message):
+        """Write-through of a committed message.
+
+        Never raises: the message is already committed. If the push fails
+        the window is dropped so the next read refills it from the database.
+        """
+        try:
+            await self._push(
+                keys=[self._key(message.conv_id), LRU_KEY],
+                args=[
+                    str(message.conv_id),
+                    self.size,
+                    self.ttl_seconds,
+                    Config.RECENT_MESSAGES_PARTIAL_TTL_SECONDS,
+                    message.seq,
+                    self._dump(message),
+                ],
+            )
+        except Exception as e:
+            logger.error(f"Recent messages push failed for conv {message.conv_id}: {e}")
+            await self.invalidate(message.conv_id)
+
+    async def invalidate(self, conv_id: UUID):
+        try:
+            await self.redis.delete(self._key(conv_id))
+        except Exception as e:
+            logger.error(f"Recent messages invalidate failed for conv {conv_id}: {e}")
+
+
+recent_messages = RecentMessagesCache(redis_client)
@@ -1,10 +1,18 @@
-from datetime import datetime
 from typing import Annotated
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, Query
 
-from .schema import CreateConvRequest, MessageResponse, FetchMessageResponse
+from ..config import Config
+from .schema import (
+    CreateConvRequest,
+    MessageResponse,
+    FetchMessageResponse,
+    ConversationChangesResponse,
+    HistoryDirection,
+    ReceiptsMode,
+    ReceiptsResponse,
+)
 from ..core.dependency import SessionDep
 from ..auth.dependency import AccessTokenBearer
 from .services import ConvServices
@@ -34,12 +42,44 @@ async def create_conversation(
 async def get_conversations(
     session: SessionDep,
     access_token: Annotated[dict, Depends(AccessTokenBearer())],
+    cursor: str | None = Query(None),
+    limit: int = Query(Config.INBOX_PAGE_SIZE, ge=1, le=100),
+    receipts: ReceiptsMode = Query(ReceiptsMode.full),
 ):
     user_id = UUID(access_token["user_id"])
-    convs = await conv_services.get_all_convs(user_id, session)
+    convs = await conv_services.get_all_convs(user_id, session, cursor, limit, receipts)
     return convs
 
 
+@conv_router.get("/changes", response_model=ConversationChangesResponse)
+async def get_conversation_changes(
+    session: SessionDep,
+    access_token: Annotated[dict, Depends(AccessTokenBearer())],
+    since: int | None = Query(None),
+    receipts: ReceiptsMode = Query(ReceiptsMode.full),
+):
+    user_id = UUID(access_token["user_id"])
+    changes = await conv_services.get_conv_changes(
+        user_id, session, since, receipts=receipts
+    )
+    return changes
+
+
+@conv_router.get("/{conv_id}/receipts", response_model=ReceiptsResponse)
+async def get_receipts(
+    conv_id: UUID,
+    session: SessionDep,
+    access_token: Annotated[dict, Depends(AccessTokenBearer())],
+    seen: bool | None = Query(None),
+    cursor: str | None = Query(None),
+    limit: int = Query(Config.RECEIPTS_PAGE_SIZE, ge=1, le=200),
+):
+    receipts = await conv_services.get_receipts(
+        conv_id, UUID(access_token["user_id"]), session, seen, cursor, limit
+    )
+    return receipts
+
+
 @conv_router.get(
     "/{conv_id}/messages",
     response_model=FetchMessageResponse,
@@ -47,33 +87,31 @@ async def get_conversations(
 async def get_messages(
     conv_id: UUID,
     session: SessionDep,
-    _: Annotated[dict, Depends(AccessTokenBearer())],
-    cursor: datetime | None = Query(None),
-    limit: int = Query(50),
+    access_token: Annotated[dict, Depends(AccessTokenBearer())],
+    cursor: str | None = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    direction: HistoryDirection = Query(HistoryDirection.before),
+    around: UUID | None = Query(None),
+    around_unread: bool = Query(False),
 ):
-    messages, next_cursor = await conv_services.get_messages(
+    messages, next_cursor, newer_cursor = await conv_services.get_messages(
         conv_id,
+        UUID(access_token["user_id"]),
         session,
         cursor,
         limit,
+        direction,
+        around,
+        around_unread,
     )
 
-    response_messages = [
-        MessageResponse(
-            _id=msg.id,
-            conversationId=msg.conv_id,
-            senderId=msg.sender_user_id,
-            content=msg.content,
-            imgUrl=msg.img_url,
-            updatedAt=msg.updated_at,
-            createdAt=msg.created_at,
-        )
-        for msg in messages
-    ]
+    # DB rows or items already cached as MessageResponse
+    response_messages = [MessageResponse.model_validate(msg) for msg in messages]
 
     return {
         "messages": response_messages,
         "nextCursor": next_cursor,
+        "newerCursor": newer_cursor,
     }
 
 
@@ -1,9 +1,11 @@
 from datetime import datetime
 from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
 import enum
 
+from ..media.storage import variant_urls
+
 class APIModel(BaseModel):
     model_config = {
         "populate_by_name": True,
@@ -26,12 +28,28 @@ class MessageResponse(APIModel):
     sender_user_id: UUID = Field(alias="senderId")
     content: str | None
     img_url: str | None = Field(default=None, alias="imgUrl")
+    seq: int | None = None
+    media_id: UUID | None = Field(default=None, alias="mediaId")
     updated_at: datetime | None = Field(default=None, alias="updatedAt")
     created_at: datetime = Field(alias="createdAt")
 
+    # Resized variants of an uploaded image, never the original
+    @computed_field
+    @property
+    def media(self) -> dict[str, str] | None:
+        return variant_urls(self.media_id) if self.media_id else None
+
+class HistoryDirection(str, enum.Enum):
+    before = "before"
+    after = "after"
+
+
 class FetchMessageResponse(BaseModel):
     messages: list[MessageResponse]
+    # Older messages: pass as cursor with direction=before
     nextCursor: str | None = None
+    # Newer messages: pass as cursor with direction=after
+    newerCursor: str | None = None
 
 class UserConvResponse(BaseModel):
     conv_id: UUID
@@ -70,14 +88,47 @@ class ConversationResponseItem(APIModel):
     id: UUID = Field(alias="_id")
     type: str
     group: GroupResponse | None
+    # Compact mode: only the caller, the last sender and the first readers
+    # (a direct conversation still has its peer), memberCount has the total
     participants: list[ParticipantResponse]
+    memberCount: int | None = None
     lastMessageAt: datetime | None
+    # Compact mode: only the first SEEN_BY_PREVIEW readers, seenCount has the total
     seenBy: list[SeenUserResponse]
+    seenCount: int | None = None
     lastMessage: LastMessageResponse | None
+    # Compact mode: only the caller's own entry
     unreadCounts: dict[str, int]
     createdAt: datetime
     updatedAt: datetime
 
 
+class ReceiptsMode(str, enum.Enum):
+    full = "full"        # every member in seenBy and unreadCounts
+    compact = "compact"  # own unread, seen count, member count and the few members shown
+
+
+class ReceiptResponse(APIModel):
+    id: UUID = Field(alias="_id")
+    displayName: str | None
+    avatarUrl: str | None
+    readSeq: int
+    seen: bool
+
+
+class ReceiptsResponse(BaseModel):
+    receipts: list[ReceiptResponse]
+    nextCursor: str | None = None
+
+
 class ConversationResponse(BaseModel):
     conversations: list[ConversationResponseItem]
+    nextCursor: str | None = None
+
+
+class ConversationChangesResponse(BaseModel):
+    conversations: list[ConversationResponseItem]
+    # Pass back as ?since= on the next call
+    watermark: int
+    # Too many changes, reload GET /conversations instead
+    resync: bool = False
@@ -1,11 +1,9 @@
-import json
 from collections import defaultdict
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from fastapi.exceptions import HTTPException
-from fastapi.responses import JSONResponse
 from fastapi_pagination.ext.sqlmodel import apaginate
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import text, tuple_
 from sqlalchemy.orm import selectinload
 from sqlmodel.ext.asyncio.session import AsyncSession
 from .schema import (
@@ -17,21 +15,42 @@ from .schema import (
     GroupResponse,
     ParticipantResponse,
     ConversationResponse,
+    ConversationChangesResponse,
+    HistoryDirection,
+    MessageResponse,
+    ReceiptResponse,
+    ReceiptsMode,
+    ReceiptsResponse,
     LastMessageSender,
     LastMessageResponse,
 )
 from uuid import UUID
-from sqlmodel import select, func, desc
+from sqlmodel import select, func, desc, or_
 
+from ..config import Config
 from ..core.model import (
     Conversation,
     ConvParticipant,
     GroupConversation,
     Message,
     ConvReadState,
+    User,
+    UserInbox,
 )
-from ..core.redis import redis_client
+from .direct import cache_created, get_or_create_direct_conv
+from .inbox import CURRENT_WATERMARK, add_members, changed_since
+from .members import conv_members
+from .receipts import read_receipts
+from .recent import recent_messages
 from ..friends.services import FriendshipService
+from ..messages.archive import message_archive
+from ..utility.cursor import decode_cursor, encode_cursor
+from ..utility.uuid7 import uuid7_time
+from ..ws.outbox import add_user_event, outbox_relay
+
+
+# Page edge: seq plus its created_at, when known, to bound the partitions read
+HistoryPosition = tuple[int, datetime | None]
 
 
 class ConvServices:
@@ -57,53 +76,11 @@ class ConvServices:
 
                 other_user_id = data.member_id[0]
 
-                # find existing direct conversation with BOTH users
-                subq = (
-                    select(ConvParticipant.conv_id)
-                    .where(ConvParticipant.user_id.in_([current_me, other_user_id]))
-                    .group_by(ConvParticipant.conv_id)
-                    .having(func.count(ConvParticipant.user_id) == 2)
-                    .subquery()
-                )
-
-                # Use a subquery to query that these two members belong to the direct type
-                stmt = select(Conversation).where(
-                    Conversation.type == ConvType.direct,
-                    Conversation.id.in_(select(subq.c.conv_id)),
-                )
-
-                result = await session.exec(stmt)
-                conv = result.first()
-
-                if conv:
-                    return conv
-
-                # create new direct conversation
-                conv = Conversation(type=ConvType.direct)
-                session.add(conv)
-                await session.flush()
-
-                session.add_all(
-                    [
-                        ConvReadState(
-                            conv_id=conv.id,
-                            user_id=current_me,
-                        ),
-                        ConvReadState(
-                            conv_id=conv.id,
-                            user_id=other_user_id,
-                        ),
-                    ]
-                )
-
-                session.add_all(
-                    [
-                        ConvParticipant(conv_id=conv.id, user_id=current_me),
-                        ConvParticipant(conv_id=conv.id, user_id=other_user_id),
-                    ]
+                # Single indexed lookup on the canonical pair key (or cache hit)
+                conv_id, created = await get_or_create_direct_conv(
+                    session, current_me, other_user_id
                 )
-
-                return conv
+                conv = await session.get(Conversation, conv_id)
 
             if data.type == ConvType.group:
                 await friendship.assert_group_friends(
@@ -137,86 +114,223 @@ class ConvServices:
                         for uid in participants
                     ]
                 )
+                await add_members(session, conv.id, participants)
 
-                return conv
+                # Let the members' nodes start expanding this group's channel
+                add_user_event(
+                    session,
+                    participants,
+                    {"event": "conv_joined", "conv_id": str(conv.id), "type": "group"},
+                )
+
+        if data.type == ConvType.direct:
+            if created:
+                await cache_created(current_me, other_user_id, conv.id)
+                await conv_members.invalidate(conv.id)
+            return conv
+
+        await conv_members.invalidate(conv.id)
+        outbox_relay.notify()
+        return conv
 
     async def get_all_convs(
         self,
         user_id: UUID,
         session: AsyncSession,
+        cursor: str | None = None,
+        limit: int = Config.INBOX_PAGE_SIZE,
+        receipts: ReceiptsMode = ReceiptsMode.full,
     ) -> ConversationResponse:
 
-        # Load conversations
+        # ---------- One page of the inbox (keyset) ----------
         stmt = (
-            select(Conversation)
-            .join(ConvParticipant)
-            .where(ConvParticipant.user_id == user_id)
-            .options(
-                selectinload(Conversation.conv_participants).selectinload(
-                    ConvParticipant.user
-                ),
-                selectinload(Conversation.group_conversation),
-            )
-            .order_by(Conversation.last_message_at.desc())
+            select(UserInbox)
+            .where(UserInbox.user_id == user_id)
+            .order_by(UserInbox.last_message_at.desc(), UserInbox.conv_id.desc())
+            .limit(limit + 1)
         )
 
-        result = await session.exec(stmt)
-        convs = result.unique().all()
+        if cursor:
+            last_at, last_conv_id = decode_cursor(cursor, 2)
+            try:
+                position = (datetime.fromisoformat(last_at), UUID(last_conv_id))
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            stmt = stmt.where(
+                tuple_(UserInbox.last_message_at, UserInbox.conv_id) < position
+            )
 
-        if not convs:
-            return ConversationResponse(conversations=[])
+        result = await session.exec(stmt)
+        inbox_rows = result.all()
 
-        conv_ids = [c.id for c in convs]
+        next_cursor = None
+        if len(inbox_rows) > limit:
+            inbox_rows = inbox_rows[:limit]
+            last = inbox_rows[-1]
+            next_cursor = encode_cursor(
+                [last.last_message_at.isoformat(), str(last.conv_id)]
+            )
 
-        # Load read states (1 query)
+        conversation_items = await self._build_items(
+            user_id, inbox_rows, session, receipts
+        )
 
-        read_stmt = select(ConvReadState).where(ConvReadState.conv_id.in_(conv_ids))
-        read_result = await session.exec(read_stmt)
-        read_states = read_result.all()
+        return ConversationResponse(
+            conversations=conversation_items, nextCursor=next_cursor
+        )
 
-        read_map: dict[UUID, dict[UUID, UUID | None]] = defaultdict(dict)
-        for r in read_states:
-            read_map[r.conv_id][r.user_id] = r.last_message_id
+    async def get_conv_changes(
+        self,
+        user_id: UUID,
+        session: AsyncSession,
+        since: int | None = None,
+        limit: int = Config.INBOX_CHANGES_LIMIT,
+        receipts: ReceiptsMode = ReceiptsMode.full,
+    ) -> ConversationChangesResponse:
+        # Every transaction older than the snapshot's xmin has finished, so
+        # anything not returned below has a changed_xid >= this watermark.
+        # Taken before the rows so it never gets ahead of what they show.
+        watermark = await session.scalar(text(CURRENT_WATERMARK))
+
+        if since is None:
+            return ConversationChangesResponse(conversations=[], watermark=watermark)
 
-        # Batch load last messages + sender (1 query)
+        stmt = (
+            select(UserInbox)
+            .where(UserInbox.user_id == user_id, changed_since(since))
+            .order_by(UserInbox.last_message_at.desc(), UserInbox.conv_id.desc())
+            .limit(limit + 1)
+        )
+        result = await session.exec(stmt)
+        inbox_rows = result.all()
 
-        last_message_ids = [
-            c.last_message_id for c in convs if c.last_message_id is not None
-        ]
+        # Too far behind: cheaper to reload the list than to diff it
+        if len(inbox_rows) > limit:
+            return ConversationChangesResponse(
+                conversations=[], watermark=watermark, resync=True
+            )
 
-        message_map: dict[UUID, Message] = {}
+        conversation_items = await self._build_items(
+            user_id, inbox_rows, session, receipts
+        )
+        return ConversationChangesResponse(
+            conversations=conversation_items, watermark=watermark
+        )
 
-        if last_message_ids:
-            msg_stmt = (
-                select(Message)
-                .where(Message.id.in_(last_message_ids))
-                .options(selectinload(Message.user))
+    async def _build_items(
+        self,
+        user_id: UUID,
+        inbox_rows: list[UserInbox],
+        session: AsyncSession,
+        receipts: ReceiptsMode = ReceiptsMode.full,
+    ) -> list[ConversationResponseItem]:
+        if not inbox_rows:
+            return []
+
+        conv_ids = [r.conv_id for r in inbox_rows]
+        compact = receipts == ReceiptsMode.compact
+
+        # ---------- Conversations of this page only ----------
+        conv_options = [selectinload(Conversation.group_conversation)]
+        if not compact:
+            conv_options.append(
+                selectinload(Conversation.conv_participants).selectinload(
+                    ConvParticipant.user
+                )
+            )
+        conv_stmt = (
+            select(Conversation)
+            .where(Conversation.id.in_(conv_ids))
+            .options(*conv_options)
+        )
+        conv_result = await session.exec(conv_stmt)
+        conv_map = {c.id: c for c in conv_result.all()}
+
+        # conv id -> (participant, user) of the members shown, in join order
+        members: dict[UUID, list[tuple[ConvParticipant, User]]] = defaultdict(list)
+        unread_map: dict[UUID, dict[UUID, int]] = defaultdict(dict)
+        seen_counts: dict[UUID, int] = {}
+        first_seen: dict[UUID, list[UUID]] = defaultdict(list)
+        member_counts: dict[UUID, int] = {}
+
+        if compact:
+            # ---------- Seen count + first readers per conversation (1 query) ----------
+            seen_counts, first_seen = await self._seen_summary(conv_ids, session)
+
+            # ---------- Member count per conversation (1 query) ----------
+            count_result = await session.exec(
+                select(ConvParticipant.conv_id, func.count())
+                .where(ConvParticipant.conv_id.in_(conv_ids))
+                .group_by(ConvParticipant.conv_id)
+            )
+            member_counts = dict(count_result.all())
+
+            # ---------- Only the members shown (1 query) ----------
+            # The caller, last senders and first readers; both sides of a
+            # direct conversation, since the peer is what the client shows
+            shown = {
+                row.conv_id: {user_id, row.last_sender_id} - {None} for row in inbox_rows
+            }
+            for conv_id, reader_ids in first_seen.items():
+                shown[conv_id].update(reader_ids)
+
+            member_result = await session.exec(
+                select(ConvParticipant, User)
+                .join(User, User.id == ConvParticipant.user_id)
+                .join(Conversation, Conversation.id == ConvParticipant.conv_id)
+                .where(
+                    ConvParticipant.conv_id.in_(conv_ids),
+                    or_(
+                        ConvParticipant.user_id.in_(set().union(*shown.values())),
+                        Conversation.type == ConvType.direct,
+                    ),
+                )
+                .order_by(ConvParticipant.joined_at, ConvParticipant.user_id)
             )
-            msg_result = await session.exec(msg_stmt)
-            messages = msg_result.all()
-            message_map = {m.id: m for m in messages}
+            for participant, user in member_result.all():
+                conv = conv_map.get(participant.conv_id)
+                if (
+                    conv is not None and conv.type == ConvType.direct
+                ) or participant.user_id in shown[participant.conv_id]:
+                    members[participant.conv_id].append((participant, user))
+        else:
+            for conv in conv_map.values():
+                members[conv.id] = [(p, p.user) for p in conv.conv_participants]
+
+            # ---------- Unread of every member (1 query) ----------
+            unread_stmt = select(
+                UserInbox.conv_id, UserInbox.user_id, UserInbox.unread
+            ).where(UserInbox.conv_id.in_(conv_ids))
+            unread_result = await session.exec(unread_stmt)
+
+            for conv_id, member_id, unread in unread_result.all():
+                unread_map[conv_id][member_id] = unread
 
         # Build response
         conversation_items: list[ConversationResponseItem] = []
 
-        for conv in convs:
+        for row in inbox_rows:
+            conv = conv_map.get(row.conv_id)
+            if conv is None:
+                continue
+            conv_members_shown = members[conv.id]
 
             # ---------- Participants ----------
             if conv.type == ConvType.direct:
                 filtered_participants = [
-                    p for p in conv.conv_participants if p.user_id != user_id
+                    (p, u) for p, u in conv_members_shown if p.user_id != user_id
                 ]
             else:
-                filtered_participants = conv.conv_participants
+                filtered_participants = conv_members_shown
 
             participants = [
                 ParticipantResponse(
-                    _id=p.user.id,
-                    displayName=p.user.display_name,
-                    avatarUrl=p.user.avatar_url,
+                    _id=u.id,
+                    displayName=u.display_name,
+                    avatarUrl=u.avatar_url,
                     joinedAt=p.joined_at,
                 )
-                for p in filtered_participants
+                for p, u in filtered_participants
             ]
 
             # ---------- Group ----------
@@ -230,65 +344,59 @@ class ConvServices:
             # ---------- Seen + Unread ----------
             seen_by: list[SeenUserResponse] = []
             unread_counts: dict[str, int] = {}
+            seen_count = None
+            member_count = None
+            users = {p.user_id: u for p, u in conv_members_shown}
+
+            if compact:
+                # O(1) per conversation whatever the group size
+                unread_counts[str(user_id)] = row.unread
+                seen_count = seen_counts.get(conv.id, 0) if conv.last_message_id else 0
+                member_count = member_counts.get(conv.id, 0)
+                if conv.last_message_id:
+                    seen_by = [
+                        SeenUserResponse(
+                            _id=users[member_id].id,
+                            displayName=users[member_id].display_name,
+                            avatarUrl=users[member_id].avatar_url,
+                        )
+                        for member_id in first_seen.get(conv.id, [])
+                        if member_id in users
+                    ]
+            else:
+                for p, u in conv_members_shown:
 
-            for p in conv.conv_participants:
-
-                user_last_read_id = read_map.get(conv.id, {}).get(p.user_id)
-
-                if not conv.last_message_id:
-                    unread_counts[str(p.user_id)] = 0
-                    continue
-
-                # Sender always read their own message
-                last_message_obj = message_map.get(conv.last_message_id)
-                if last_message_obj and last_message_obj.sender_user_id == p.user_id:
-                    unread_counts[str(p.user_id)] = 0
-                    continue
-
-                # Get last read time
-                last_read_time = None
-
-                if user_last_read_id:
-                    last_read_msg = message_map.get(user_last_read_id)
-                    if last_read_msg:
-                        last_read_time = last_read_msg.created_at
-
-                stmt = (
-                    select(func.count(Message.id))
-                    .where(Message.conv_id == conv.id)
-                    .where(Message.sender_user_id != p.user_id)
-                )
-
-                if last_read_time:
-                    stmt = stmt.where(Message.created_at > last_read_time)
+                    if not conv.last_message_id:
+                        unread_counts[str(p.user_id)] = 0
+                        continue
 
-                result = await session.exec(stmt)
-                count = result.one()
+                    count = unread_map.get(conv.id, {}).get(p.user_id, 0)
 
-                unread_counts[str(p.user_id)] = count
+                    unread_counts[str(p.user_id)] = count
 
-                if count == 0:
-                    seen_by.append(
-                        SeenUserResponse(
-                            _id=p.user.id,
-                            displayName=p.user.display_name,
-                            avatarUrl=p.user.avatar_url,
+                    if count == 0:
+                        seen_by.append(
+                            SeenUserResponse(
+                                _id=u.id,
+                                displayName=u.display_name,
+                                avatarUrl=u.avatar_url,
+                            )
                         )
-                    )
 
             # ---------- Last Message ----------
+            # Preview from the inbox row, sender from the loaded participants
             last_message_response = None
-            last_message_obj = message_map.get(conv.last_message_id)
+            sender = users.get(row.last_sender_id)
 
-            if last_message_obj:
+            if row.last_message_id and sender:
                 last_message_response = LastMessageResponse(
-                    _id=last_message_obj.id,
-                    content=last_message_obj.content or "",
-                    createdAt=last_message_obj.created_at,
+                    _id=row.last_message_id,
+                    content=row.last_message_preview or "",
+                    createdAt=row.last_message_at,
                     sender=LastMessageSender(
-                        _id=last_message_obj.user.id,
-                        displayName=last_message_obj.user.display_name,
-                        avatarUrl=last_message_obj.user.avatar_url,
+                        _id=sender.id,
+                        displayName=sender.display_name,
+                        avatarUrl=sender.avatar_url,
                     ),
                 )
 
@@ -298,8 +406,10 @@ class ConvServices:
                 type=conv.type,
                 group=group_data,
                 participants=participants,
+                memberCount=member_count,
                 lastMessageAt=conv.last_message_at,
                 seenBy=seen_by,
+                seenCount=seen_count,
                 lastMessage=last_message_response,
                 unreadCounts=unread_counts,
                 createdAt=conv.created_at,
@@ -308,7 +418,139 @@ class ConvServices:
 
             conversation_items.append(item)
 
-        return ConversationResponse(conversations=conversation_items)
+        return conversation_items
+
+    async def _seen_summary(
+        self, conv_ids: list[UUID], session: AsyncSession
+    ) -> tuple[dict[UUID, int], dict[UUID, list[UUID]]]:
+        """Per conversation: how many members read everything, and the first few of them."""
+        seen = (
+            select(
+                UserInbox.conv_id,
+                UserInbox.user_id,
+                func.count().over(partition_by=UserInbox.conv_id).label("seen_count"),
+                func.row_number()
+                .over(
+                    partition_by=UserInbox.conv_id,
+                    order_by=(ConvParticipant.joined_at, ConvParticipant.user_id),
+                )
+                .label("rank"),
+            )
+            .join(
+                ConvParticipant,
+                (ConvParticipant.conv_id == UserInbox.conv_id)
+                & (ConvParticipant.user_id == UserInbox.user_id),
+            )
+            .where(UserInbox.conv_id.in_(conv_ids), UserInbox.unread == 0)
+            .subquery()
+        )
+        result = await session.exec(
+            select(seen.c.conv_id, seen.c.user_id, seen.c.seen_count)
+            .where(seen.c.rank <= Config.SEEN_BY_PREVIEW)
+            .order_by(seen.c.conv_id, seen.c.rank)
+        )
+
+        seen_counts: dict[UUID, int] = {}
+        first_seen: dict[UUID, list[UUID]] = defaultdict(list)
+        for conv_id, member_id, seen_count in result.all():
+            seen_counts[conv_id] = seen_count
+            first_seen[conv_id].append(member_id)
+        return seen_counts, first_seen
+
+    async def get_receipts(
+        self,
+        conv_id: UUID,
+        user_id: UUID,
+        session: AsyncSession,
+        seen: bool | None = None,
+        cursor: str | None = None,
+        limit: int = Config.RECEIPTS_PAGE_SIZE,
+    ) -> ReceiptsResponse:
+        """Every member's read state, a page at a time in join order."""
+        members = await conv_members.get(session, conv_id)
+        if not members or user_id not in members.user_ids:
+            raise HTTPException(status_code=403, detail="Not a conversation member")
+
+        # Nobody has seen anything in an empty conversation
+        last_seq = await session.scalar(
+            select(Conversation.last_seq).where(Conversation.id == conv_id)
+        )
+        if not last_seq and seen:
+            return ReceiptsResponse(receipts=[])
+
+        stmt = (
+            select(
+                ConvParticipant.joined_at,
+                User.id,
+                User.display_name,
+                User.avatar_url,
+                func.coalesce(ConvReadState.read_seq, 0),
+                func.coalesce(UserInbox.unread, 0),
+            )
+            .join(User, User.id == ConvParticipant.user_id)
+            .outerjoin(
+                ConvReadState,
+                (ConvReadState.conv_id == ConvParticipant.conv_id)
+                & (ConvReadState.user_id == ConvParticipant.user_id),
+            )
+            .outerjoin(
+                UserInbox,
+                (UserInbox.conv_id == ConvParticipant.conv_id)
+                & (UserInbox.user_id == ConvParticipant.user_id),
+            )
+            .where(ConvParticipant.conv_id == conv_id)
+            .order_by(ConvParticipant.joined_at, ConvParticipant.user_id)
+            .limit(limit + 1)
+        )
+
+        if seen is not None:
+            stmt = stmt.where(
+                func.coalesce(UserInbox.unread, 0) == 0
+                if seen
+                else func.coalesce(UserInbox.unread, 0) > 0
+            )
+
+        if cursor:
+            joined_at, member_id = decode_cursor(cursor, 2)
+            try:
+                position = (datetime.fromisoformat(joined_at), UUID(member_id))
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            stmt = stmt.where(
+                tuple_(ConvParticipant.joined_at, ConvParticipant.user_id) > position
+            )
+
+        result = await session.exec(stmt)
+        rows = result.all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1][0].isoformat(), str(rows[-1][1])])
+
+        receipts = [
+            ReceiptResponse(
+                _id=member_id,
+                displayName=display_name,
+                avatarUrl=avatar_url,
+                readSeq=read_seq,
+                seen=bool(last_seq) and unread == 0,
+            )
+            for _, member_id, display_name, avatar_url, read_seq, unread in rows
+        ]
+        return ReceiptsResponse(receipts=receipts, nextCursor=next_cursor)
+
+    async def group_conv_ids(self, user_id: UUID, session: AsyncSession) -> list[UUID]:
+        stmt = (
+            select(ConvParticipant.conv_id)
+            .join(Conversation)
+            .where(
+                ConvParticipant.user_id == user_id,
+                Conversation.type == ConvType.group,
+            )
+        )
+        result = await session.exec(stmt)
+        return result.all()
 
     async def get_user_conversations_for_websocket(
         self, user_id: UUID, session: AsyncSession
@@ -326,111 +568,244 @@ class ConvServices:
         user_id: UUID,
         session: AsyncSession,
     ):
-        # ---------- Validate conversation ----------
-        conv = await session.get(Conversation, conv_id)
-        if not conv:
+        # ---------- Validate (cached) ----------
+        members = await conv_members.get(session, conv_id)
+        if not members:
             raise HTTPException(status_code=404, detail="Conversation not found")
-
-        if not conv.last_message_id:
-            return JSONResponse(
-                status_code=200,
-                content={"message": "No message to mark as read"},
-            )
-
-        last_message = await session.get(Message, conv.last_message_id)
-        if not last_message:
-            return JSONResponse(
-                status_code=200,
-                content={"message": "Last message not found"},
-            )
-
-        if last_message.sender_user_id == user_id:
-            return JSONResponse(
-                status_code=200,
-                content={"message": "Own message - no need to mark as read"},
-            )
-
-        stmt = (
-            insert(ConvReadState)
-            .values(
-                conv_id=conv_id,
-                user_id=user_id,
-                last_message_id=conv.last_message_id,
-            )
-            .on_conflict_do_update(
-                index_elements=["conv_id", "user_id"],
-                set_={
-                    "last_message_id": conv.last_message_id,
-                },
+        if user_id not in members.user_ids:
+            raise HTTPException(status_code=403, detail="Not a conversation member")
+
+        # Pointer and unread count in one primary key lookup each
+        result = await session.exec(
+            select(Conversation.last_seq, Conversation.last_message_id, UserInbox.unread)
+            .outerjoin(
+                UserInbox,
+                (UserInbox.conv_id == Conversation.id) & (UserInbox.user_id == user_id),
             )
+            .where(Conversation.id == conv_id)
         )
+        last_seq, last_message_id, unread = result.one()
 
-        await session.exec(stmt)
-        await session.commit()
+        if not last_message_id:
+            return {"message": "No message to mark as read"}
 
-        stmt = (
-            select(ConvParticipant.user_id)
-            .where(ConvParticipant.conv_id == conv_id)
-            .where(ConvParticipant.user_id != user_id)
-        )
+        # Own last message or already read: the pointer is there
+        if unread == 0:
+            return {"message": "Nothing new to mark as read"}
 
-        result = await session.exec(stmt)
-        receivers = result.all()
+        # ---------- Write-behind: flushed and published in batches ----------
+        await read_receipts.mark(conv_id, user_id, last_seq, last_message_id)
 
-        payload = {
-            "event": "read-message",
-            "conv_id": str(conv_id),
-            "last_message_id": str(conv.last_message_id),
+        return {
+            "message": "Marked as read",
             "seen_by": str(user_id),
         }
 
-        # ---------- Publish Redis ----------
-        for uid in receivers:
-            await redis_client.publish(
-                "broadcast",
-                json.dumps(
-                    {
-                        "key": f"user:{uid}",
-                        "data": payload,
-                    }
-                ),
+    async def get_messages(
+        self,
+        conv_id: UUID,
+        user_id: UUID,
+        session: AsyncSession,
+        cursor: str | None = None,
+        limit: int = 50,
+        direction: HistoryDirection = HistoryDirection.before,
+        around: UUID | None = None,
+        around_unread: bool = False,
+    ) -> tuple[list[Message | MessageResponse], str | None, str | None]:
+        """A page of history, old -> new, with the cursors to keep going.
+
+        Returns (messages, older_cursor, newer_cursor). A cursor is the
+        (seq, created_at) of a page edge: seq is the send order the
+        conversation row lock assigned, created_at bounds the scan so only
+        the partitions it can reach are read. Pages walk
+        idx_message_conv_seq, and read through to the archive chunks once
+        they go past the oldest hot row.
+        """
+        members = await conv_members.get(session, conv_id)
+        if not members or user_id not in members.user_ids:
+            raise HTTPException(status_code=403, detail="Not a conversation member")
+
+        # ---------- Window around an anchor ----------
+        anchor: HistoryPosition | None = None
+        if around:
+            message = await _get_message(session, around) or await message_archive.find(
+                session, conv_id, message_id=around
+            )
+            if not message or message.conv_id != conv_id:
+                raise HTTPException(status_code=404, detail="Message not found")
+            anchor = (message.seq, message.created_at)
+        elif around_unread:
+            result = await session.exec(
+                select(
+                    Conversation.last_seq,
+                    func.coalesce(ConvReadState.read_seq, 0),
+                    ConvReadState.last_message_id,
+                )
+                .outerjoin(
+                    ConvReadState,
+                    (ConvReadState.conv_id == Conversation.id)
+                    & (ConvReadState.user_id == user_id),
+                )
+                .where(Conversation.id == conv_id)
+            )
+            last_seq, read_seq, read_message_id = result.one()
+
+            # A pointer still waiting for the flush is the newer one
+            pending = await read_receipts.pending(conv_id, user_id)
+            if pending and pending[0] > read_seq:
+                read_seq, read_message_id = pending
+
+            # First unread by seq, sent after the last read message;
+            # everything read -> plain latest page
+            if read_seq < last_seq:
+                try:
+                    read_at = uuid7_time(read_message_id) if read_message_id else None
+                except ValueError:
+                    read_at = None
+                anchor = (read_seq + 1, read_at)
+
+        if anchor is not None:
+            older, more_older = await self._history_page(
+                session, conv_id, anchor, older=True, limit=limit // 2
+            )
+            newer, more_newer = await self._history_page(
+                session, conv_id, anchor, older=False, limit=limit - limit // 2,
+                inclusive=True,
+            )
+            messages = older + newer
+            return (
+                messages,
+                _history_cursor(messages[0]) if more_older and messages else None,
+                _history_cursor(messages[-1]) if more_newer and messages else None,
             )
 
-        return JSONResponse(
-            status_code=200,
-            content={
-                "message": "Marked as read",
-                "seen_by": str(user_id),
-            },
-        )
+        # ---------- First page: recent-messages cache ----------
+        if not cursor and direction == HistoryDirection.before:
+            cached = await recent_messages.latest(conv_id, limit)
+            if cached is not None:
+                older_cursor = _history_cursor(cached[0]) if cached[0].seq > 1 else None
+                return cached, older_cursor, None
 
-    async def get_messages(
-            self,
-            conv_id: UUID,
-            session: AsyncSession,
-            cursor: datetime | None = None,
-            limit: int = 50,
-    ):
-        stmt = (
-            select(Message)
-            .where(Message.conv_id == conv_id)
-            .order_by(desc(Message.created_at))
-            .limit(limit + 1)
-        )
+            messages, has_more = await self._history_page(
+                session, conv_id, None, older=True, limit=limit
+            )
+            await recent_messages.fill(conv_id, messages)
+            older_cursor = _history_cursor(messages[0]) if has_more else None
+            return messages, older_cursor, None
 
+        # ---------- Paging from a cursor ----------
+        position = None
         if cursor:
-            stmt = stmt.where(Message.created_at < cursor)
+            seq, created_at = decode_cursor(cursor, 2)
+            try:
+                position = (int(seq), datetime.fromisoformat(created_at))
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+
+        if direction == HistoryDirection.after:
+            messages, has_more = await self._history_page(
+                session, conv_id, position, older=False, limit=limit
+            )
+            older_cursor = _history_cursor(messages[0]) if messages else cursor
+            newer_cursor = _history_cursor(messages[-1]) if has_more else None
+            return messages, older_cursor, newer_cursor
 
-        result = await session.exec(stmt)
-        messages = result.all()
+        messages, has_more = await self._history_page(
+            session, conv_id, position, older=True, limit=limit
+        )
+        older_cursor = _history_cursor(messages[0]) if has_more else None
+        newer_cursor = None
+        if position is not None:
+            newer_cursor = _history_cursor(messages[-1]) if messages else cursor
+        return messages, older_cursor, newer_cursor
+
+    async def _history_page(
+        self,
+        session: AsyncSession,
+        conv_id: UUID,
+        position: HistoryPosition | None,
+        older: bool,
+        limit: int,
+        inclusive: bool = False,
+    ) -> tuple[list[Message], bool]:
+        if limit <= 0:
+            return [], position is not None
+
+        seq, at = position if position else (None, None)
+        # Timestamps only roughly follow seq (node clocks before ids came
+        # from Postgres), hence the slack; a month partition is still
+        # skipped unless a page edge is within it
+        skew = timedelta(seconds=Config.MESSAGE_CLOCK_SKEW_SECONDS)
+
+        # The hot rows and the archive's high-water seq come from one
+        # statement, so one snapshot: the hot rows continue exactly after
+        # it. Archive reads are cut at that seq, so a chunk the archiver
+        # commits meanwhile (from rows already read hot) is not read twice,
+        # and the rows it took are not missed
+        archived_through = message_archive.archived_through(conv_id)
+        stmt = select(Message, archived_through).where(Message.conv_id == conv_id)
+
+        if older:
+            if seq is not None:
+                stmt = stmt.where(Message.seq < seq)
+            if at is not None:
+                stmt = stmt.where(Message.created_at <= at + skew)
+            stmt = stmt.order_by(desc(Message.seq))
+
+            result = await session.exec(stmt.limit(limit + 1))
+            rows = result.all()
+            messages = [m for m, _ in rows]
+
+            # Hot rows ran out: the rest of the way back is in the archive
+            if len(messages) <= limit:
+                if rows:
+                    after_archive = rows[0][1] + 1
+                    seq = min(seq or after_archive, after_archive)
+                archived = await message_archive.page(
+                    session, conv_id, seq, older=True,
+                    limit=limit + 1 - len(messages),
+                )
+                messages += reversed(archived)
+        else:
+            if seq is not None:
+                stmt = stmt.where(Message.seq >= seq if inclusive else Message.seq > seq)
+            if at is not None:
+                stmt = stmt.where(Message.created_at >= at - skew)
+            stmt = stmt.order_by(Message.seq)
+
+            result = await session.exec(stmt.limit(limit + 1))
+            rows = result.all()
+            hot = [m for m, _ in rows]
+
+            # The archive only holds what precedes every hot row
+            messages = []
+            if seq is None or not rows or seq <= rows[0][1]:
+                messages = await message_archive.page(
+                    session, conv_id, seq, older=False,
+                    limit=limit + 1, inclusive=inclusive,
+                )
+                if rows:
+                    messages = [m for m in messages if m.seq <= rows[0][1]]
+            messages = (messages + hot)[: limit + 1]
+
+        has_more = len(messages) > limit
+        messages = messages[:limit]  # bỏ record dư
+
+        if older:
+            messages.reverse()  # old → new
+
+        return messages, has_more
 
-        next_cursor = None
 
-        if len(messages) > limit:
-            next_message = messages[-1]
-            next_cursor = next_message.created_at.isoformat()
-            messages.pop()  # bỏ record dư
+async def _get_message(session: AsyncSession, message_id: UUID) -> Message | None:
+    # By full primary key: only the partition of the id's month is read
+    try:
+        created_at = uuid7_time(message_id)
+    except ValueError:
+        # Not one of our ids: no such message
+        return None
+    return await session.get(Message, (message_id, created_at))
 
-        messages.reverse()  # old → new
 
-        return messages, next_cursor
+def _history_cursor(message: Message | MessageResponse) -> str:
+    return encode_cursor([message.seq, message.created_at.isoformat()])
@@ -2,7 +2,10 @@ from sqlmodel import SQLModel, Field, Column, Relationship
 import enum
 from uuid import UUID, uuid4
 from datetime import datetime
-from sqlalchemy import DateTime, func, Index, Enum, ForeignKey
+from sqlalchemy import DateTime, func, Index, Enum, BigInteger, Boolean, text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from ..utility.uuid7 import uuid7
 
 
 class User(SQLModel, table=True):
@@ -104,13 +107,31 @@ class Friend(SQLModel, table=True):
 
 
 class Message(SQLModel, table=True):
-    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    """Range partitioned by created_at, one partition per month.
+
+    created_at is the timestamp of the UUIDv7 id, so a message id alone is
+    enough to pick its partition.
+    """
+
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+
+    # Time-ordered: sorts like send order, usable as a history cursor
+    id: UUID = Field(default_factory=uuid7, primary_key=True)
     conv_id: UUID = Field(default=None, foreign_key="conversation.id", nullable=False)
     sender_user_id: UUID = Field(default=None, foreign_key="user.id", nullable=False)
     content: str | None = Field(default=None, nullable=True)
     img_url: str | None = Field(default=None, nullable=True)
+    # Position in the conversation: 1, 2, 3... without gaps
+    seq: int = Field(default=None, sa_column=Column(BigInteger, nullable=False))
+    # Uploaded image; img_url then points at one of its variants
+    media_id: UUID | None = Field(default=None, foreign_key="media.id", nullable=True)
     created_at: datetime = Field(
-        sa_column=Column(DateTime(timezone=True), server_default=func.now())
+        sa_column=Column(
+            DateTime(timezone=True),
+            primary_key=True,
+            nullable=False,
+            server_default=func.now(),
+        )
     )
     updated_at: datetime = Field(
         sa_column=Column(
@@ -131,20 +152,23 @@ class ConvType(str, enum.Enum):
 
 
 class Conversation(SQLModel, table=True):
-    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    id: UUID = Field(default_factory=uuid7, primary_key=True)
 
     type: ConvType = Field(sa_column=Column(Enum(ConvType), nullable=False))
 
-    last_message_id: UUID | None = Field(
-        default=None,
-        sa_column=Column(
-            ForeignKey("message.id", use_alter=True, name="fk_conv_last_message"),
-            nullable=True,
-        ),
-    )
+    # "<user_a>:<user_b>" (sorted) for direct conversations, NULL for groups
+    direct_key: str | None = Field(default=None, unique=True, nullable=True)
+
+    # No foreign key: message is partitioned and its key includes created_at
+    last_message_id: UUID | None = Field(default=None, nullable=True)
 
     last_message_at: datetime | None = Field(sa_column=Column(DateTime(timezone=True)))
 
+    # seq of the latest message
+    last_seq: int = Field(
+        default=0, sa_column=Column(BigInteger, nullable=False, server_default="0")
+    )
+
     created_at: datetime = Field(
         sa_column=Column(DateTime(timezone=True), server_default=func.now())
     )
@@ -170,7 +194,7 @@ class Conversation(SQLModel, table=True):
     )
     last_message: Message | None = Relationship(
         sa_relationship_kwargs={
-            "foreign_keys": "[Conversation.last_message_id]",
+            "primaryjoin": "foreign(Conversation.last_message_id) == Message.id",
             "viewonly": True,
         }
     )
@@ -211,9 +235,22 @@ class ConvReadState(SQLModel, table=True):
         primary_key=True,
     )
 
-    last_message_id: UUID | None = Field(
-        foreign_key="message.id",
-        nullable=True,
+    last_message_id: UUID | None = Field(default=None, nullable=True)
+
+    # Messages up to this seq are read; unread = last_seq - read_seq
+    read_seq: int = Field(
+        default=0, sa_column=Column(BigInteger, nullable=False, server_default="0")
+    )
+
+    # Id of the last transaction that moved read_seq: the other members'
+    # seenBy changed, without writing their user_inbox rows
+    changed_xid: int | None = Field(
+        default=None,
+        sa_column=Column(
+            BigInteger,
+            nullable=False,
+            server_default=text("pg_current_xact_id()::text::bigint"),
+        ),
     )
 
     updated_at: datetime = Field(
@@ -225,6 +262,158 @@ class ConvReadState(SQLModel, table=True):
     )
 
 
+class UserInbox(SQLModel, table=True):
+    """One row per (member, conversation): what the conversation list shows.
+
+    Maintained in the same transaction as sends and reads so listing the
+    inbox is a single index range scan.
+    """
+
+    __tablename__ = "user_inbox"
+
+    user_id: UUID = Field(foreign_key="user.id", primary_key=True)
+    conv_id: UUID = Field(foreign_key="conversation.id", primary_key=True)
+    # Last activity: the latest message, or joining the conversation
+    last_message_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    )
+    last_message_id: UUID | None = Field(default=None, nullable=True)
+    last_sender_id: UUID | None = Field(default=None, nullable=True)
+    last_message_preview: str | None = Field(default=None, nullable=True)
+    unread: int = Field(default=0, sa_column=Column(BigInteger, nullable=False, server_default="0"))
+    # Id of the last transaction that changed what this row shows
+    changed_xid: int | None = Field(
+        default=None,
+        sa_column=Column(
+            BigInteger,
+            nullable=False,
+            server_default=text("pg_current_xact_id()::text::bigint"),
+        ),
+    )
+
+
+class MessageArchiveChunk(SQLModel, table=True):
+    """A run of archived messages of one conversation, stored in one file."""
+
+    __tablename__ = "message_archive_chunk"
+
+    id: int | None = Field(
+        default=None, sa_column=Column(BigInteger, primary_key=True, autoincrement=True)
+    )
+    conv_id: UUID = Field(foreign_key="conversation.id", nullable=False)
+    # Min/max of the chunk's timestamps and ids, both ends included; send
+    # order is the seq range
+    first_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+    first_id: UUID = Field(nullable=False)
+    last_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+    last_id: UUID = Field(nullable=False)
+    first_seq: int = Field(sa_column=Column(BigInteger, nullable=False))
+    last_seq: int = Field(sa_column=Column(BigInteger, nullable=False))
+    message_count: int = Field(nullable=False)
+    # Relative to ARCHIVE_DIR
+    path: str = Field(nullable=False)
+    created_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), server_default=func.now())
+    )
+
+
+class MediaStatus(str, enum.Enum):
+    pending = "pending"  # variants not generated yet
+    ready = "ready"
+    failed = "failed"
+
+
+class Media(SQLModel, table=True):
+    """An uploaded image, stored once per distinct content (by SHA-256)."""
+
+    id: UUID = Field(default_factory=uuid7, primary_key=True)
+    sha256: str = Field(unique=True, nullable=False, max_length=64)
+    # First uploader; later uploads of the same bytes share the row
+    owner_id: UUID = Field(foreign_key="user.id", nullable=False)
+    content_type: str = Field(nullable=False)
+    size: int = Field(sa_column=Column(BigInteger, nullable=False))
+    width: int = Field(nullable=False)
+    height: int = Field(nullable=False)
+    status: MediaStatus = Field(
+        default=MediaStatus.pending,
+        sa_column=Column(Enum(MediaStatus), nullable=False),
+    )
+    created_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), server_default=func.now())
+    )
+
+
+class MediaUpload(SQLModel, table=True):
+    """Who uploaded a media; everyone whose upload was deduped onto it counts."""
+
+    __tablename__ = "media_upload"
+
+    media_id: UUID = Field(foreign_key="media.id", primary_key=True)
+    user_id: UUID = Field(foreign_key="user.id", primary_key=True)
+    created_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), server_default=func.now())
+    )
+
+
+class OutboxEvent(SQLModel, table=True):
+    """Realtime event written in the same transaction as the change it reports."""
+
+    __tablename__ = "outbox"
+
+    id: int | None = Field(
+        default=None, sa_column=Column(BigInteger, primary_key=True, autoincrement=True)
+    )
+    # {"users": [...]} or {"conv_id": ..., "exclude": [...]}
+    target: dict = Field(sa_column=Column(JSONB, nullable=False))
+    payload: dict = Field(sa_column=Column(JSONB, nullable=False))
+    durable: bool = Field(sa_column=Column(Boolean, nullable=False, server_default="true"))
+    created_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), server_default=func.now())
+    )
+
+
 Index("idx_conv_last_message_at", Conversation.last_message_at.desc())
 
 Index("idx_conv_participant_user", ConvParticipant.user_id, ConvParticipant.conv_id)
+
+Index(
+    "idx_conv_participant_joined",
+    ConvParticipant.conv_id,
+    ConvParticipant.joined_at,
+    ConvParticipant.user_id,
+)
+
+# Not unique: that would have to include created_at. Seqs are already
+# serialized by the conversation row lock.
+Index("idx_message_conv_seq", Message.conv_id, Message.seq)
+
+Index("idx_message_conv_created", Message.conv_id, Message.created_at, Message.id)
+
+Index("idx_message_sender_conv", Message.sender_user_id, Message.conv_id)
+
+Index(
+    "idx_user_inbox_keyset",
+    UserInbox.user_id,
+    UserInbox.last_message_at,
+    UserInbox.conv_id,
+)
+
+Index("idx_user_inbox_conv", UserInbox.conv_id)
+
+# Members who read everything, counted for seen-by summaries
+Index(
+    "idx_user_inbox_seen",
+    UserInbox.conv_id,
+    UserInbox.user_id,
+    postgresql_where=UserInbox.unread == 0,
+)
+
+Index("idx_user_inbox_changes", UserInbox.user_id, UserInbox.changed_xid)
+
+Index("idx_convreadstate_changes", ConvReadState.conv_id, ConvReadState.changed_xid)
+
+Index("idx_archive_chunk_conv_seq", MessageArchiveChunk.conv_id, MessageArchiveChunk.first_seq)
+
+Index("idx_friend_user_a_user_b", Friend.user_a, Friend.user_b)
+
+Index("idx_friend_user_b", Friend.user_b)
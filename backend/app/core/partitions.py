@@ -0,0 +1,134 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..config import Config
+from .session import engine
+
+logger = logging.getLogger(__name__)
+
+# pg advisory lock key, one process creates partitions at a time
+PARTITION_LOCK_KEY = 0x6D7367706172
+
+
+def _add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def message_partitions(
+    now: datetime, months_ahead: int
+) -> list[tuple[str, datetime, datetime]]:
+    """(name, start, end) of the monthly message partitions from now on."""
+    current = now.astimezone(timezone.utc).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+    partitions = []
+    for i in range(months_ahead + 1):
+        start = _add_months(current, i)
+        end = _add_months(current, i + 1)
+        partitions.append((f"message_{start:%Y_%m}", start, end))
+    return partitions
+
+
+async def ensure_message_partitions(
+    bind: AsyncEngine = engine, months_ahead: int = Config.MESSAGE_PARTITIONS_AHEAD
+) -> list[str]:
+    """Create the missing monthly partitions, returns the ones created."""
+    created = []
+    async with bind.begin() as conn:
+        await conn.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY}
+        )
+        for name, start, end in message_partitions(
+            datetime.now(timezone.utc), months_ahead
+        ):
+            # Only missing ones: creating a partition locks the parent
+            exists = await conn.scalar(text("SELECT to_regclass(:name)"), {"name": name})
+            if exists is not None:
+                continue
+
+            await conn.execute(
+                text(
+                    f"CREATE TABLE {name} PARTITION OF message "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                )
+            )
+            created.append(name)
+
+    for name in created:
+        logger.info(f"Created partition {name}")
+    return created
+
+
+async def drop_empty_partitions(before: datetime, bind: AsyncEngine = engine) -> list[str]:
+    """Drop the message partitions ending before the given time that hold no rows."""
+    dropped = []
+    async with bind.begin() as conn:
+        await conn.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY}
+        )
+        result = await conn.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'message'::regclass ORDER BY c.relname"
+            )
+        )
+        for (name,) in result.all():
+            try:
+                start = datetime.strptime(name, "message_%Y_%m").replace(tzinfo=timezone.utc)
+            except ValueError:
+                continue
+            if _add_months(start, 1) > before:
+                continue
+
+            if await conn.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {name})")):
+                continue
+
+            await conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+
+    for name in dropped:
+        logger.info(f"Dropped empty partition {name}")
+    return dropped
+
+
+class PartitionKeeper:
+    """Keep message partitions created ahead of time, checked periodically."""
+
+    def __init__(self, interval_seconds: float = Config.MESSAGE_PARTITION_CHECK_SECONDS):
+        self.interval_seconds = interval_seconds
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="partition-keeper")
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await ensure_message_partitions()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Partition keeper error: {e}")
+
+            await asyncio.sleep(self.interval_seconds)
+
+
+partition_keeper = PartitionKeeper()
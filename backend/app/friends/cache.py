@@ -0,0 +1,89 @@
+from uuid import UUID
+
+from sqlmodel import select, or_
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..config import Config
+from ..core.model import Friend
+from ..core.redis import redis_client
+
+# friends:{id} is a Redis set of the user's friend ids plus a sentinel
+# member, so an empty friend list is still a cache hit. friends:ver:{id} is
+# bumped on every change; a fill computed before a change is discarded.
+
+LOADED = "*"
+
+# KEYS: friends key, version key
+# ARGV: version read before the query, ttl seconds, members...
+FILL_SCRIPT = """
+local current = redis.call('GET', KEYS[2]) or '0'
+if current ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+-- In batches: unpack of a long list overflows Lua's C stack
+for i = 3, #ARGV, 1000 do
+    redis.call('SADD', KEYS[1], unpack(ARGV, i, math.min(i + 999, #ARGV)))
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class FriendCache:
+    def __init__(self, redis, ttl_seconds: int = Config.FRIEND_CACHE_TTL_SECONDS):
+        self.redis = redis
+        self.ttl_seconds = ttl_seconds
+        self._fill = redis.register_script(FILL_SCRIPT)
+
+    def _key(self, user_id: UUID):
+        return f"friends:{user_id}"
+
+    def _version_key(self, user_id: UUID):
+        return f"friends:ver:{user_id}"
+
+    async def are_friends(
+        self, user_id: UUID, target_ids: list[UUID], session: AsyncSession
+    ) -> list[bool]:
+        """Membership of each target in user_id's friend set, one round trip on a hit."""
+        flags = await self.redis.smismember(
+            self._key(user_id), [LOADED, *map(str, target_ids)]
+        )
+        if flags[0]:
+            return [bool(f) for f in flags[1:]]
+
+        friend_ids = set(await self.load(user_id, session))
+        return [t in friend_ids for t in target_ids]
+
+    async def friend_ids(self, user_id: UUID, session: AsyncSession) -> list[UUID]:
+        members = await self.redis.smembers(self._key(user_id))
+        if LOADED in members:
+            return [UUID(m) for m in members if m != LOADED]
+        return await self.load(user_id, session)
+
+    async def load(self, user_id: UUID, session: AsyncSession) -> list[UUID]:
+        version = await self.redis.get(self._version_key(user_id)) or "0"
+
+        stmt = select(Friend.user_a, Friend.user_b).where(
+            or_(Friend.user_a == user_id, Friend.user_b == user_id)
+        )
+        result = await session.exec(stmt)
+        friend_ids = [b if a == user_id else a for a, b in result.all()]
+
+        await self._fill(
+            keys=[self._key(user_id), self._version_key(user_id)],
+            args=[version, self.ttl_seconds, LOADED, *map(str, friend_ids)],
+        )
+        return friend_ids
+
+    async def invalidate(self, *user_ids: UUID):
+        """Call after the friendship change is committed."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.incr(self._version_key(user_id))
+                pipe.expire(self._version_key(user_id), self.ttl_seconds)
+                pipe.delete(self._key(user_id))
+            await pipe.execute()
+
+
+friend_cache = FriendCache(redis_client)
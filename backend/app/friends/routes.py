@@ -40,6 +40,11 @@ async def decline_friend(request_id:str, session: SessionDep, access_token: Anno
     decline_request = await friend_service.decline_request_friend(UUID(access_token.get("user_id")), request_id, session)
     return decline_request
 
+@friend_router.delete("/{friend_id}", status_code=204)
+async def unfriend(friend_id: UUID, session: SessionDep, access_token: Annotated[dict, Depends(AccessTokenBearer())]):
+    result = await friend_service.unfriend(UUID(access_token.get("user_id")), friend_id, session)
+    return result
+
 @friend_router.get("/")
 async def all_friends(session: SessionDep, access_token: Annotated[dict, Depends(AccessTokenBearer())]):
     friends = await friend_service.get_all_friends(UUID(access_token.get("user_id")), session)
@@ -4,9 +4,10 @@ from fastapi import HTTPException
 from pygments.lexers import data
 from sqlalchemy.orm import selectinload
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlmodel import select, or_, and_
+from sqlmodel import select, or_
 from fastapi.responses import JSONResponse
 
+from .cache import friend_cache
 from .schema import (
     NewFriendResponse,
     AllFriendsResponse,
@@ -92,6 +93,8 @@ class FriendServices:
             # Get user request
             from_user = await session.get(User, request.from_user_id)
 
+        await friend_cache.invalidate(user_a, user_b)
+
         return NewFriendResponse(
             from_user_id=from_user.id,
             user_name=from_user.username,
@@ -110,6 +113,22 @@ class FriendServices:
         await session.commit()
         return []
 
+    async def unfriend(self, current_me: UUID, friend_id: UUID, session: AsyncSession):
+        user_a, user_b = sorted((current_me, friend_id))  # normalization
+
+        stmt = select(Friend).where(Friend.user_a == user_a, Friend.user_b == user_b)
+        result = await session.exec(stmt)
+        friends = result.all()
+        if not friends:
+            raise HTTPException(status_code=404, detail="Friend not found")
+
+        for friend in friends:
+            await session.delete(friend)
+        await session.commit()
+
+        await friend_cache.invalidate(user_a, user_b)
+        return []
+
     async def get_all_friends(
         self, current_me: UUID, session: AsyncSession
     ) -> list[AllFriendsResponse]:
@@ -188,34 +207,24 @@ class FriendServices:
         return SentReceivedFriendsRequest(sent=sent, received=received)
 
 class FriendshipService:
+    """Friendship checks on the hot paths, answered from the friend cache."""
+
+    async def friend_ids(self, user_id: UUID | str, session: AsyncSession) -> list[UUID]:
+        return await friend_cache.friend_ids(UUID(str(user_id)), session)
+
     async def assert_direct_friend(self, user_id: UUID, target_id: UUID, session: AsyncSession):
         if user_id == target_id:
             raise HTTPException(400, "You can't create conversation with yourself")
 
-        stmt = select(Friend).where(
-            or_(
-                and_(Friend.user_a == user_id, Friend.user_b == target_id),
-                and_(Friend.user_b == user_id, Friend.user_a == target_id),
-            )
-        )
-        result = await session.exec(stmt)
-        if not result.first():
+        [is_friend] = await friend_cache.are_friends(user_id, [target_id], session)
+        if not is_friend:
             raise HTTPException(400, "You are not friends with this person yet")
 
     async def assert_group_friends(self, user_id: UUID, member_ids: list[UUID], session: AsyncSession):
         if not member_ids:
             raise HTTPException(400, "Member is required")
 
-        stmt = select(Friend).where(
-            or_(Friend.user_a == user_id, Friend.user_b == user_id)
-        )
-        result = await session.exec(stmt)
-        friends = result.all()
-
-        friend_ids = {
-            f.user_b if f.user_a == user_id else f.user_a
-            for f in friends
-        }
-
-        if not set(member_ids).issubset(friend_ids):
+        # One SMISMEMBER for the whole member list
+        flags = await friend_cache.are_friends(user_id, list(member_ids), session)
+        if not all(flags):
             raise HTTPException(400, "Some members are not your friends!")
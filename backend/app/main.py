@@ -1,18 +1,25 @@
 from contextlib import asynccontextmanager
 from fastapi.responses import JSONResponse
 from fastapi import FastAPI, WebSocket
+from fastapi.staticfiles import StaticFiles
 from .friends.routes import friend_router
 from .conversations.routes import conv_router
 from .messages.routes import message_router
+from .media.routes import media_router
+from .media.storage import VARIANTS_PREFIX
 from .middleware import register_middleware
 from .auth.routes import auth_router
 from .config import Config
 from .core.logging import setup_logging
+from .core.partitions import partition_keeper
+from .conversations.receipts import read_receipts
 from fastapi_pagination import add_pagination
 import redis.asyncio as redis
 import logging
+import os
 
-from .ws.ws import ws_router
+from .ws.outbox import outbox_relay
+from .ws.ws import ws_router, subscriber, lease_keeper
 
 version_prefix = Config.API_VER
 setup_logging()
@@ -30,7 +37,18 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Redis failed: {e}")
         raise
+
+    subscriber.start()
+    lease_keeper.start()
+    outbox_relay.start()
+    partition_keeper.start()
+    read_receipts.start()
     yield
+    await read_receipts.stop()
+    await partition_keeper.stop()
+    await outbox_relay.stop()
+    await lease_keeper.stop()
+    await subscriber.stop()
     await app.state.redis.close()
     logger.info("Redis closed")
 
@@ -74,8 +92,20 @@ app.include_router(
 app.include_router(
     message_router, prefix=f"/{version_prefix}/messages", tags=["Messages"]
 )
+app.include_router(media_router, prefix=f"/{version_prefix}/media", tags=["Media"])
 app.include_router(ws_router, prefix=f"/{version_prefix}/ws", tags=["WebSocket"])
 
+# Local media storage serves its own files; other backends hand out their URLs.
+# Only the variants: originals are never handed to clients
+if Config.MEDIA_STORAGE == "local":
+    app.mount(
+        f"{Config.MEDIA_BASE_URL.rstrip('/')}/{VARIANTS_PREFIX}",
+        StaticFiles(
+            directory=os.path.join(Config.MEDIA_DIR, VARIANTS_PREFIX), check_dir=False
+        ),
+        name="media",
+    )
+
 
 # Add pagination support
 add_pagination(app)
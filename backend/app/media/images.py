@@ -0,0 +1,51 @@
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+from ..config import Config
+from .storage import VARIANTS, Storage, variant_key
+
+FORMATS = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "WEBP": "image/webp",
+    "GIF": "image/gif",
+}
+
+# EXIF orientations that turn the image by 90 degrees
+ROTATED = {5, 6, 7, 8}
+
+
+def probe(path: str) -> tuple[str, int, int]:
+    """(content type, width, height) as displayed. Reads the header only."""
+    with Image.open(path) as image:
+        if image.format not in FORMATS:
+            raise ValueError(f"Unsupported format {image.format}")
+
+        width, height = image.size
+        if width * height > Config.MEDIA_MAX_PIXELS:
+            raise ValueError("Image too large")
+
+        if image.getexif().get(0x0112) in ROTATED:
+            width, height = height, width
+        return FORMATS[image.format], width, height
+
+
+def render_variants(storage: Storage, media_id, source_key: str):
+    """Write every variant of an original, largest first."""
+    largest = max(VARIANTS.values())
+
+    with storage.open(source_key) as f, Image.open(f) as image:
+        # JPEG decodes straight at a reduced scale, far cheaper for big photos
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            has_alpha = image.mode in ("LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+
+        # Each size shrinks the previous one; smaller originals aren't upscaled
+        for name, edge in sorted(VARIANTS.items(), key=lambda item: -item[1]):
+            image.thumbnail((edge, edge))
+            buffer = BytesIO()
+            image.save(buffer, "WEBP", quality=80, method=4)
+            storage.put(variant_key(media_id, name), buffer.getvalue(), "image/webp")
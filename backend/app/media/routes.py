@@ -0,0 +1,64 @@
+from typing import Annotated
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Request
+
+from .schema import AvatarResponse, MediaResponse, SetAvatarRequest
+from .services import MediaService
+from ..auth.dependency import AccessTokenBearer
+from ..core.dependency import SessionDep
+
+media_router = APIRouter()
+media_services = MediaService()
+
+
+# The body is parsed by the service as it streams in, so the form is only
+# described here for the docs
+UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            }
+        },
+    }
+}
+
+
+@media_router.post(
+    "/", response_model=MediaResponse, status_code=201, openapi_extra=UPLOAD_BODY
+)
+async def upload_media(
+    request: Request,
+    access_token: Annotated[dict, Depends(AccessTokenBearer())],
+    session: SessionDep,
+):
+    media = await media_services.upload(UUID(access_token["user_id"]), request, session)
+    return media
+
+
+@media_router.put("/avatar", response_model=AvatarResponse)
+async def set_avatar(
+    data: SetAvatarRequest,
+    access_token: Annotated[dict, Depends(AccessTokenBearer())],
+    session: SessionDep,
+):
+    avatar = await media_services.set_avatar(
+        UUID(access_token["user_id"]), data.media_id, session
+    )
+    return avatar
+
+
+@media_router.get("/{media_id}", response_model=MediaResponse)
+async def get_media(
+    media_id: UUID,
+    access_token: Annotated[dict, Depends(AccessTokenBearer())],
+    session: SessionDep,
+):
+    media = await media_services.get_media(media_id, session)
+    return media
@@ -0,0 +1,30 @@
+from uuid import UUID
+
+from pydantic import BaseModel, Field, computed_field
+
+from ..conversations.schema import APIModel
+from ..core.model import MediaStatus
+from .storage import variant_urls
+
+
+class MediaResponse(APIModel):
+    id: UUID = Field(alias="_id")
+    status: MediaStatus
+    content_type: str = Field(alias="contentType")
+    size: int
+    width: int
+    height: int
+
+    @computed_field
+    @property
+    def variants(self) -> dict[str, str]:
+        return variant_urls(self.id)
+
+
+class SetAvatarRequest(BaseModel):
+    media_id: UUID
+
+
+class AvatarResponse(BaseModel):
+    avatarId: UUID
+    avatarUrl: str
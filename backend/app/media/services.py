@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import os
+from uuid import UUID
+
+from fastapi import HTTPException, Request
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..celery_task import generate_media_variants
+from ..config import Config
+from ..core.model import Media, MediaStatus, MediaUpload, User
+from .images import probe, render_variants
+from .schema import AvatarResponse
+from .storage import media_storage, original_key, variant_url
+from .upload import receive_upload
+
+logger = logging.getLogger(__name__)
+
+
+class MediaService:
+
+    async def upload(self, user_id: UUID, request: Request, session: AsyncSession) -> Media:
+        """Store an image once per content; variants are made by a Celery task."""
+        path, sha256, size = await receive_upload(request)
+        try:
+            try:
+                content_type, width, height = await asyncio.to_thread(probe, path)
+            except Exception:
+                raise HTTPException(status_code=415, detail="Unsupported image")
+
+            # Already have these bytes: nothing to store or render
+            enqueue = None
+            media = await session.scalar(select(Media).where(Media.sha256 == sha256))
+            if not media:
+                await asyncio.to_thread(media_storage.save, original_key(sha256), path)
+
+                media_id = await session.scalar(
+                    insert(Media)
+                    .values(
+                        owner_id=user_id,
+                        sha256=sha256,
+                        content_type=content_type,
+                        size=size,
+                        width=width,
+                        height=height,
+                        status=MediaStatus.pending,
+                    )
+                    .on_conflict_do_nothing(index_elements=["sha256"])
+                    .returning(Media.id)
+                )
+
+                # None: a concurrent upload of the same bytes won the insert
+                enqueue = media_id
+
+                media = await session.scalar(select(Media).where(Media.sha256 == sha256))
+            elif media.status == MediaStatus.failed:
+                enqueue = media.id
+
+            # Deduped or not, the caller may now attach it
+            await session.exec(
+                insert(MediaUpload)
+                .values(media_id=media.id, user_id=user_id)
+                .on_conflict_do_nothing()
+            )
+            await session.commit()
+
+            # Only once committed: the worker must be able to see the row
+            if enqueue:
+                await _enqueue_variants(enqueue)
+            return media
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    async def get_media(self, media_id: UUID, session: AsyncSession) -> Media:
+        media = await session.get(Media, media_id)
+        if not media:
+            raise HTTPException(status_code=404, detail="Media not found")
+        return media
+
+    async def set_avatar(
+        self, user_id: UUID, media_id: UUID, session: AsyncSession
+    ) -> AvatarResponse:
+        media = await usable_media(session, media_id, user_id)
+        user = await session.get(User, user_id)
+
+        # Avatars are shown small everywhere (inbox, participants, friends)
+        user.avatar_id = media.id
+        user.avatar_url = variant_url(media.id, "thumb")
+        session.add(user)
+        await session.commit()
+
+        return AvatarResponse(avatarId=media.id, avatarUrl=user.avatar_url)
+
+
+async def usable_media(session: AsyncSession, media_id: UUID, user_id: UUID) -> Media:
+    """The media, if user_id uploaded it and its variants are ready to link to."""
+    result = await session.exec(
+        select(Media, MediaUpload.user_id)
+        .outerjoin(
+            MediaUpload,
+            (MediaUpload.media_id == Media.id) & (MediaUpload.user_id == user_id),
+        )
+        .where(Media.id == media_id)
+    )
+    row = result.first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    media, uploader = row
+    if uploader is None:
+        raise HTTPException(status_code=403, detail="Media was not uploaded by you")
+    if media.status != MediaStatus.ready:
+        raise HTTPException(status_code=409, detail=f"Media is {media.status.value}")
+    return media
+
+
+async def _enqueue_variants(media_id: UUID):
+    # delay() talks to the broker synchronously
+    await asyncio.to_thread(generate_media_variants.delay, str(media_id))
+
+
+async def generate_variants(bind: AsyncEngine, media_id: UUID):
+    """Render and store the variants of one media, then mark it ready."""
+    async with AsyncSession(bind, expire_on_commit=False) as session:
+        media = await session.get(Media, media_id)
+        if media is None:
+            # Not committed yet, or rolled back: the task retries a few times
+            raise LookupError(f"Media {media_id} not found")
+        if media.status == MediaStatus.ready:
+            return
+
+        try:
+            await asyncio.to_thread(
+                render_variants, media_storage, media.id, original_key(media.sha256)
+            )
+            media.status = MediaStatus.ready
+        except Exception as e:
+            logger.error(f"Variants failed for media {media_id}: {e}")
+            media.status = MediaStatus.failed
+
+        session.add(media)
+        await session.commit()
@@ -0,0 +1,92 @@
+import os
+import shutil
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import BinaryIO
+from uuid import UUID
+
+from ..config import Config
+
+# Longest edge of each generated variant, all encoded as WebP. Clients only
+# ever get these, never the original upload
+VARIANTS = {
+    "thumb": 160,
+    "small": 480,
+    "medium": 1080,
+    "large": 1920,
+}
+
+
+def original_key(sha256: str) -> str:
+    # Content addressed: the same bytes always land on the same key
+    return f"originals/{sha256[:2]}/{sha256}"
+
+
+# Key prefix of the variants, the only keys ever served
+VARIANTS_PREFIX = "variants"
+
+
+def variant_key(media_id: UUID, name: str) -> str:
+    return f"{VARIANTS_PREFIX}/{media_id}/{name}.webp"
+
+
+class Storage(ABC):
+    """Where media bytes live, addressed by relative keys.
+
+    Blocking calls: run them in a thread from async code.
+    """
+
+    @abstractmethod
+    def save(self, key: str, path: str):
+        """Take over a local file, e.g. a finished upload."""
+
+    @abstractmethod
+    def put(self, key: str, data: bytes, content_type: str): ...
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO: ...
+
+    @abstractmethod
+    def url(self, key: str) -> str: ...
+
+
+class LocalStorage(Storage):
+    """Files under MEDIA_DIR, served from MEDIA_BASE_URL."""
+
+    def __init__(self, root: str = Config.MEDIA_DIR, base_url: str = Config.MEDIA_BASE_URL):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+
+    def save(self, key: str, path: str):
+        target = self.root / key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(path, target)
+
+    def put(self, key: str, data: bytes, content_type: str):
+        target = self.root / key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, target)
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.root / key, "rb")
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+
+# Other backends (S3, GCS...) register here and are picked by MEDIA_STORAGE
+STORAGE_BACKENDS: dict[str, type[Storage]] = {
+    "local": LocalStorage,
+}
+
+media_storage: Storage = STORAGE_BACKENDS[Config.MEDIA_STORAGE]()
+
+
+def variant_url(media_id: UUID, name: str) -> str:
+    return media_storage.url(variant_key(media_id, name))
+
+
+def variant_urls(media_id: UUID) -> dict[str, str]:
+    return {name: variant_url(media_id, name) for name in VARIANTS}
@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+
+from fastapi import HTTPException, Request
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from ..config import Config
+
+# Form field the image comes in
+FILE_FIELD = b"file"
+
+# Allowance for the boundaries and part headers around the image
+BODY_OVERHEAD_BYTES = 64 * 1024
+
+
+class _FilePart:
+    """Parser callbacks keeping the data of the FILE_FIELD part, dropping the rest."""
+
+    def __init__(self):
+        self.found = False
+        self.in_file = False
+        self.pending: list[bytes] = []
+        self._field = b""
+        self._value = b""
+        self._disposition = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._value += data[start:end]
+
+    def on_header_end(self):
+        if self._field.lower() == b"content-disposition":
+            self._disposition = self._value
+        self._field = self._value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        # Only the first file part counts
+        self.in_file = (
+            not self.found
+            and options.get(b"name") == FILE_FIELD
+            and b"filename" in options
+        )
+        self.found = self.found or self.in_file
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self.in_file:
+            self.pending.append(data[start:end])
+
+    def on_part_end(self):
+        self.in_file = False
+
+    def take(self) -> bytes:
+        data = b"".join(self.pending)
+        self.pending.clear()
+        return data
+
+
+async def receive_upload(request: Request) -> tuple[str, str, int]:
+    """Stream the multipart body's file to a temp file, hashing on the way.
+
+    The body is parsed as it comes off the socket, so the size limit holds
+    before anything is spooled; a declared Content-Length over it is
+    refused without reading. Returns (path, sha256, size).
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type"))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected multipart/form-data")
+
+    max_body = Config.MEDIA_MAX_BYTES + BODY_OVERHEAD_BYTES
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_body:
+        raise HTTPException(status_code=413, detail="File too large")
+
+    part = _FilePart()
+    parser = MultipartParser(boundary, part.callbacks())
+    digest = hashlib.sha256()
+    received = size = 0
+    fd, path = tempfile.mkstemp(prefix="upload-")
+
+    try:
+        with os.fdopen(fd, "wb") as out:
+            # Chunked bodies declare no length: count what actually arrives
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > max_body:
+                    raise HTTPException(status_code=413, detail="File too large")
+
+                try:
+                    parser.write(chunk)
+                except MultipartParseError:
+                    raise HTTPException(status_code=400, detail="Malformed multipart body")
+
+                if data := part.take():
+                    size += len(data)
+                    if size > Config.MEDIA_MAX_BYTES:
+                        raise HTTPException(status_code=413, detail="File too large")
+
+                    digest.update(data)
+                    await asyncio.to_thread(out.write, data)
+
+            parser.finalize()
+    except BaseException:
+        os.remove(path)
+        raise
+
+    if not part.found:
+        os.remove(path)
+        raise HTTPException(status_code=400, detail="Missing file")
+    if size == 0:
+        os.remove(path)
+        raise HTTPException(status_code=400, detail="Empty file")
+
+    return path, digest.hexdigest(), size
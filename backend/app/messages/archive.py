@@ -0,0 +1,308 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from itertools import takewhile
+from pathlib import Path
+from uuid import UUID
+
+from sqlalchemy import delete, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import desc, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..config import Config
+from ..core.cache import LRUCache
+from ..core.model import Conversation, Message, MessageArchiveChunk
+from ..core.partitions import drop_empty_partitions
+
+logger = logging.getLogger(__name__)
+
+# pg advisory lock key, one archiver runs at a time
+ARCHIVE_LOCK_KEY = 0x61726368697665
+
+
+def dump_message(message: Message) -> dict:
+    return {
+        "id": str(message.id),
+        "conv_id": str(message.conv_id),
+        "sender_user_id": str(message.sender_user_id),
+        "content": message.content,
+        "img_url": message.img_url,
+        "seq": message.seq,
+        "media_id": str(message.media_id) if message.media_id else None,
+        "created_at": message.created_at.isoformat(),
+        "updated_at": message.updated_at.isoformat() if message.updated_at else None,
+    }
+
+
+def load_message(line: bytes) -> Message:
+    data = json.loads(line)
+    return Message(
+        id=UUID(data["id"]),
+        conv_id=UUID(data["conv_id"]),
+        sender_user_id=UUID(data["sender_user_id"]),
+        content=data["content"],
+        img_url=data["img_url"],
+        seq=data["seq"],
+        media_id=UUID(data["media_id"]) if data.get("media_id") else None,
+        created_at=datetime.fromisoformat(data["created_at"]),
+        updated_at=(
+            datetime.fromisoformat(data["updated_at"]) if data["updated_at"] else None
+        ),
+    )
+
+
+class MessageArchive:
+    """Cold history: gzip JSON-lines chunks on disk, indexed in Postgres.
+
+    A conversation's archive is always a prefix of its history (everything
+    before the cutoff except the last message), so the hot table continues
+    exactly where the archive stops.
+    """
+
+    def __init__(
+        self, root: str = Config.ARCHIVE_DIR, cache_size: int = Config.ARCHIVE_CACHE_CHUNKS
+    ):
+        self.root = Path(root)
+        # Chunk files never change once indexed: decoded ones are kept by
+        # path, so paging through a chunk does not gunzip it on every page
+        self.decoded: LRUCache[str, list[Message]] = LRUCache(cache_size)
+
+    # ---------- Writing ----------
+
+    def _write_file(self, relative: str, messages: list[Message]):
+        path = self.root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+
+        with gzip.open(tmp, "wb") as f:
+            for message in messages:
+                f.write(json.dumps(dump_message(message), ensure_ascii=False).encode() + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Complete file or nothing, under a name a retry would reuse
+        os.replace(tmp, path)
+
+    async def archive_chunk(self, session: AsyncSession, conv_id: UUID, messages: list[Message]):
+        """File the messages and delete them from the hot table, in the caller's transaction."""
+        first, last = messages[0], messages[-1]
+        relative = f"{conv_id}/{first.seq:012d}-{last.seq:012d}.jsonl.gz"
+
+        await asyncio.to_thread(self._write_file, relative, messages)
+
+        # Ids and timestamps follow the clocks of the nodes that took the
+        # sends, so they are bounded by min/max rather than by seq order
+        first_at = min(m.created_at for m in messages)
+        last_at = max(m.created_at for m in messages)
+        session.add(
+            MessageArchiveChunk(
+                conv_id=conv_id,
+                first_at=first_at,
+                first_id=min(m.id for m in messages),
+                last_at=last_at,
+                last_id=max(m.id for m in messages),
+                first_seq=first.seq,
+                last_seq=last.seq,
+                message_count=len(messages),
+                path=relative,
+            )
+        )
+        await session.exec(
+            delete(Message).where(
+                Message.conv_id == conv_id,
+                Message.id.in_([m.id for m in messages]),
+                # Keeps the delete within the chunk's partitions
+                Message.created_at >= first_at,
+                Message.created_at <= last_at,
+            )
+        )
+
+    # ---------- Reading ----------
+
+    def _read_file(self, relative: str) -> list[Message]:
+        with gzip.open(self.root / relative, "rb") as f:
+            return [load_message(line) for line in f]
+
+    async def _load(self, relative: str) -> list[Message]:
+        rows = self.decoded.get(relative)
+        if rows is None:
+            rows = await asyncio.to_thread(self._read_file, relative)
+            self.decoded.set(relative, rows)
+        return rows
+
+    def _read_lines(self, relative: str) -> list[bytes]:
+        with gzip.open(self.root / relative, "rb") as f:
+            return f.readlines()
+
+    async def chunk_lines(self, session: AsyncSession, conv_id: UUID, after_seq: int = 0):
+        """Raw JSON lines of the archive past after_seq, old -> new.
+
+        Yields (lines, last_seq) per chunk. The chunk list is read up front,
+        in the caller's transaction; the files are read after.
+        """
+        result = await session.exec(
+            select(MessageArchiveChunk.path, MessageArchiveChunk.last_seq)
+            .where(
+                MessageArchiveChunk.conv_id == conv_id,
+                MessageArchiveChunk.first_seq > after_seq,
+            )
+            .order_by(MessageArchiveChunk.first_seq)
+        )
+        for path, last_seq in result.all():
+            yield await asyncio.to_thread(self._read_lines, path), last_seq
+
+    def archived_through(self, conv_id: UUID):
+        """Scalar subquery: the last archived seq of the conversation, 0 if none."""
+        # The archive is a seq prefix, so this is its newest chunk
+        last = (
+            select(MessageArchiveChunk.last_seq)
+            .where(MessageArchiveChunk.conv_id == conv_id)
+            .order_by(desc(MessageArchiveChunk.first_seq))
+            .limit(1)
+            .scalar_subquery()
+        )
+        return func.coalesce(last, 0)
+
+    async def page(
+        self,
+        session: AsyncSession,
+        conv_id: UUID,
+        position: int | None,
+        older: bool,
+        limit: int,
+        inclusive: bool = False,
+    ) -> list[Message]:
+        """Like a hot history page by seq, old -> new, read from the chunk files."""
+        if limit <= 0:
+            return []
+
+        stmt = select(MessageArchiveChunk).where(MessageArchiveChunk.conv_id == conv_id)
+
+        if older:
+            if position is not None:
+                stmt = stmt.where(MessageArchiveChunk.first_seq < position)
+            stmt = stmt.order_by(desc(MessageArchiveChunk.first_seq))
+        else:
+            if position is not None:
+                stmt = stmt.where(
+                    MessageArchiveChunk.last_seq >= position
+                    if inclusive
+                    else MessageArchiveChunk.last_seq > position
+                )
+            stmt = stmt.order_by(MessageArchiveChunk.first_seq)
+
+        messages: list[Message] = []
+        result = await session.exec(stmt)
+        for chunk in result.all():
+            rows = await self._load(chunk.path)
+
+            if older:
+                if position is not None:
+                    rows = [m for m in rows if m.seq < position]
+                messages = rows[-(limit - len(messages)):] + messages
+            else:
+                if position is not None:
+                    rows = [
+                        m for m in rows
+                        if (m.seq >= position if inclusive else m.seq > position)
+                    ]
+                messages += rows[: limit - len(messages)]
+
+            if len(messages) >= limit:
+                break
+
+        return messages
+
+    async def find(
+        self,
+        session: AsyncSession,
+        conv_id: UUID,
+        message_id: UUID | None = None,
+        seq: int | None = None,
+    ) -> Message | None:
+        stmt = select(MessageArchiveChunk).where(MessageArchiveChunk.conv_id == conv_id)
+        if seq is not None:
+            stmt = stmt.where(
+                MessageArchiveChunk.first_seq <= seq, MessageArchiveChunk.last_seq >= seq
+            )
+        else:
+            # Id bounds of neighbouring chunks can overlap: try each candidate
+            stmt = stmt.where(
+                MessageArchiveChunk.first_id <= message_id,
+                MessageArchiveChunk.last_id >= message_id,
+            )
+
+        result = await session.exec(stmt.order_by(MessageArchiveChunk.first_seq))
+        for chunk in result.all():
+            rows = await self._load(chunk.path)
+            found = next(
+                (m for m in rows if m.id == message_id or (seq is not None and m.seq == seq)),
+                None,
+            )
+            if found:
+                return found
+        return None
+
+
+message_archive = MessageArchive()
+
+
+async def archive_old_messages(
+    bind: AsyncEngine,
+    older_than_days: int = Config.ARCHIVE_AFTER_DAYS,
+    chunk_size: int = Config.ARCHIVE_CHUNK_SIZE,
+) -> int:
+    """Move messages older than the cutoff into archive chunks, returns how many."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    archived = 0
+
+    async with AsyncSession(bind, expire_on_commit=False) as session:
+        result = await session.exec(
+            select(Message.conv_id).where(Message.created_at < cutoff).distinct()
+        )
+        conv_ids = result.all()
+        await session.commit()
+
+        for conv_id in conv_ids:
+            while True:
+                # One chunk per transaction; concurrent runs queue here and
+                # then only see what is still hot
+                await session.exec(
+                    text("SELECT pg_advisory_xact_lock(:key)"),
+                    params={"key": ARCHIVE_LOCK_KEY},
+                )
+
+                # Oldest hot messages by seq, so the archive stays a seq
+                # prefix. The last message stays hot: the conversation
+                # points at it
+                stmt = (
+                    select(Message)
+                    .join(Conversation, Conversation.id == Message.conv_id)
+                    .where(
+                        Message.conv_id == conv_id,
+                        Message.seq < Conversation.last_seq,
+                    )
+                    .order_by(Message.seq)
+                    .limit(chunk_size)
+                )
+                result = await session.exec(stmt)
+                messages = list(
+                    takewhile(lambda m: m.created_at < cutoff, result.all())
+                )
+                if not messages:
+                    await session.commit()
+                    break
+
+                await message_archive.archive_chunk(session, conv_id, messages)
+                await session.commit()
+                archived += len(messages)
+
+    # Months emptied by the archive no longer need a table
+    await drop_empty_partitions(cutoff, bind)
+
+    logger.info(f"Archived {archived} messages older than {cutoff.isoformat()}")
+    return archived
@@ -0,0 +1,113 @@
+import json
+import zlib
+from uuid import UUID
+
+from sqlmodel import select
+
+from ..config import Config
+from ..core.model import Message
+from ..core.session import AsyncSessionLocal
+from .archive import dump_message, message_archive
+
+EXPORT_COLUMNS = (
+    Message.id,
+    Message.conv_id,
+    Message.sender_user_id,
+    Message.content,
+    Message.img_url,
+    Message.seq,
+    Message.media_id,
+    Message.created_at,
+    Message.updated_at,
+)
+
+
+class ChunkWriter:
+    """Collects NDJSON lines and hands them out in chunks, gzipped if asked."""
+
+    def __init__(self, compress: bool, flush_bytes: int = Config.EXPORT_FLUSH_BYTES):
+        # wbits=31: gzip container, so the output is a plain .gz file
+        self._compressor = zlib.compressobj(wbits=31) if compress else None
+        self._buffer = bytearray()
+        self.flush_bytes = flush_bytes
+
+    def write(self, line: bytes) -> bytes:
+        self._buffer += line
+        if len(self._buffer) < self.flush_bytes:
+            return b""
+        return self._take()
+
+    def close(self) -> bytes:
+        data = self._take()
+        if self._compressor:
+            data += self._compressor.flush()
+        return data
+
+    def _take(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        if self._compressor:
+            data = self._compressor.compress(data)
+        return data
+
+
+async def stream_messages(
+    conv_ids: list[UUID], sender_id: UUID | None = None, compress: bool = False
+):
+    """NDJSON of the conversations' messages by seq, archive first, then the hot rows.
+
+    Rows come from a server-side cursor a partition of EXPORT_YIELD_PER at a
+    time and leave as soon as a flush worth of bytes is ready, so memory
+    stays flat whatever the size of the history.
+    """
+    writer = ChunkWriter(compress)
+
+    def keep(line: bytes) -> bool:
+        return not sender_id or json.loads(line)["sender_user_id"] == str(sender_id)
+
+    # Own session: the stream outlives the request handler
+    async with AsyncSessionLocal() as session:
+        for conv_id in conv_ids:
+            # Chunk files never change once indexed, so they need no snapshot
+            archived_through = 0
+            async for lines, last_seq in message_archive.chunk_lines(session, conv_id):
+                for line in filter(keep, lines):
+                    if data := writer.write(line):
+                        yield data
+                archived_through = last_seq
+            await session.commit()
+
+            # One snapshot per conversation for the rest: chunks archived
+            # since the listing above, then the rows still hot in it. The
+            # archive is a seq prefix, so the two meet without gap or overlap
+            await session.connection(
+                execution_options={"isolation_level": "REPEATABLE READ"}
+            )
+            async for lines, last_seq in message_archive.chunk_lines(
+                session, conv_id, after_seq=archived_through
+            ):
+                for line in filter(keep, lines):
+                    if data := writer.write(line):
+                        yield data
+                archived_through = last_seq
+
+            stmt = (
+                select(*EXPORT_COLUMNS)
+                .where(Message.conv_id == conv_id, Message.seq > archived_through)
+                .order_by(Message.seq)
+                .execution_options(yield_per=Config.EXPORT_YIELD_PER)
+            )
+            if sender_id:
+                stmt = stmt.where(Message.sender_user_id == sender_id)
+
+            result = await session.stream(stmt)
+            async for rows in result.partitions():
+                for row in rows:
+                    line = json.dumps(dump_message(row), ensure_ascii=False).encode()
+                    if data := writer.write(line + b"\n"):
+                        yield data
+
+            await session.rollback()
+
+    if data := writer.close():
+        yield data
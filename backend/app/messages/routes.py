@@ -1,10 +1,17 @@
 from uuid import UUID
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
 from fastapi.params import Depends
 from typing import Annotated
 
-from .schema import CreateDirectMessage, CreateGroupMessage
+from .schema import (
+    CreateDirectMessage,
+    CreateGroupMessage,
+    MessageSearchResponse,
+    SearchMode,
+)
+from ..config import Config
 from ..auth.dependency import AccessTokenBearer
 from ..friends.deps import friendship_service
 from ..friends.services import FriendshipService
@@ -28,6 +35,40 @@ async def direct_message(
     return new_message
 
 
+@message_router.get("/search", response_model=MessageSearchResponse)
+async def search_messages(
+    access_token: Annotated[dict, Depends(AccessTokenBearer())],
+    session: SessionDep,
+    q: str = Query(..., min_length=1, max_length=200),
+    mode: SearchMode = Query(SearchMode.words),
+    conv_id: UUID | None = Query(None),
+    cursor: UUID | None = Query(None),
+    limit: int = Query(Config.SEARCH_PAGE_SIZE, ge=1, le=100),
+):
+    results = await message_services.search_messages(
+        UUID(access_token["user_id"]), q, session, mode, conv_id, cursor, limit
+    )
+    return results
+
+
+@message_router.get("/export")
+async def export_messages(
+    access_token: Annotated[dict, Depends(AccessTokenBearer())],
+    session: SessionDep,
+    conv_id: UUID | None = Query(None),
+    gzip: bool = Query(False),
+):
+    user_id = UUID(access_token["user_id"])
+    stream = await message_services.export_messages(user_id, session, conv_id, gzip)
+
+    filename = f"messages-{conv_id or user_id}.ndjson" + (".gz" if gzip else "")
+    return StreamingResponse(
+        stream,
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @message_router.post("/group")
 async def group_message(
     data: CreateGroupMessage,
@@ -1,20 +1,59 @@
 from datetime import datetime
+from urllib.parse import urlsplit
 from uuid import UUID
 
-from pydantic import BaseModel
+import enum
 
-class CreateDirectMessage(BaseModel):
+from pydantic import BaseModel, Field, field_validator
+
+from ..conversations.schema import APIModel
+
+class MessageAttachment(BaseModel):
+    # Deprecated: kept so older clients linking an external image still
+    # work. Stored as sent, so only plain http(s) links are accepted; new
+    # clients upload the image and send media_id, which wins over it
+    img_url: str | None = Field(
+        default=None, max_length=2048, json_schema_extra={"deprecated": True}
+    )
+    media_id: UUID | None = None
+
+    @field_validator("img_url")
+    def validate_img_url(cls, v):
+        if v is not None and urlsplit(v).scheme not in ("http", "https"):
+            raise ValueError("img_url must be an http(s) URL.")
+        return v
+
+class CreateDirectMessage(MessageAttachment):
     content: str
-    img_url: str | None = None
     recipient_id: UUID
     conv_id: UUID | None = None
 
-class CreateGroupMessage(BaseModel):
+class CreateGroupMessage(MessageAttachment):
     conv_id: UUID
     content: str
-    img_url: str | None = None
 
 class UpdateConvFromNewMess(BaseModel):
     last_message_content: str
     last_message_sender_id: UUID
     last_message_at: datetime | None = datetime.now()
+
+
+class SearchMode(str, enum.Enum):
+    words = "words"          # full-text, whole words
+    prefix = "prefix"        # full-text, every word as a prefix
+    substring = "substring"  # anywhere in the text (trigram)
+
+
+class MessageSearchResult(APIModel):
+    id: UUID = Field(alias="_id")
+    conv_id: UUID = Field(alias="conversationId")
+    sender_user_id: UUID = Field(alias="senderId")
+    seq: int
+    created_at: datetime = Field(alias="createdAt")
+    # HTML-escaped text with the matches wrapped in <mark></mark>
+    snippet: str
+
+
+class MessageSearchResponse(BaseModel):
+    results: list[MessageSearchResult]
+    nextCursor: str | None = None
@@ -1,16 +1,36 @@
-import json
+import html
+import re
 from uuid import UUID
 
 from fastapi import HTTPException
-from sqlalchemy import func
-from sqlmodel import select
+from sqlalchemy import literal_column, tuple_, update
+from sqlmodel import desc, func, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from .schema import CreateDirectMessage, CreateGroupMessage
+from .export import stream_messages
+from .schema import (
+    CreateDirectMessage,
+    CreateGroupMessage,
+    MessageSearchResponse,
+    MessageSearchResult,
+    SearchMode,
+)
+from ..config import Config
+from ..conversations.direct import (
+    cache_created,
+    find_direct_conv,
+    get_or_create_direct_conv,
+)
+from ..conversations.inbox import record_message
+from ..conversations.members import conv_members
+from ..conversations.recent import recent_messages
 from ..conversations.schema import ConvType
 from ..core.model import Conversation, ConvParticipant, Message, ConvReadState
-from ..core.redis import redis_client
 from ..friends.services import FriendshipService
+from ..media.services import usable_media
+from ..media.storage import variant_url, variant_urls
+from ..utility.uuid7 import uuid7_time
+from ..ws.outbox import add_conv_event, add_user_event, outbox_relay
 
 
 class MessageService:
@@ -24,7 +44,7 @@ class MessageService:
     ) -> Message:
 
         # Validate
-        if not data.content and not data.img_url:
+        if not data.content and not data.img_url and not data.media_id:
             raise HTTPException(
                 status_code=400,
                 detail="Message must have content or image",
@@ -37,114 +57,51 @@ class MessageService:
             session=session,
         )
 
-        conv: Conversation | None = None
-
         # ===============================
-        # CASE 1: Có conv_id -> dùng luôn
+        # Resolve the pair's conversation: cache hit or one indexed lookup
         # ===============================
-        conv_id = data.conv_id
-        if conv_id:
-            stmt = (
-                select(Conversation)
-                .join(ConvParticipant)
-                .where(
-                    Conversation.id == conv_id,
-                    Conversation.type == ConvType.direct,
-                    ConvParticipant.user_id.in_([current_me, data.recipient_id]),
-                )
-                .group_by(Conversation.id)
-                .having(func.count(ConvParticipant.user_id) == 2)
-            )
-
-            conv = await session.scalar(stmt)
+        if data.conv_id:
+            conv_id = await find_direct_conv(session, current_me, data.recipient_id)
 
-            if not conv:
+            if conv_id != data.conv_id:
                 raise HTTPException(
                     status_code=404,
                     detail="Conversation not found",
                 )
-
-        # =========================================
-        # CASE 2: Không có conv_id -> tìm hoặc tạo
-        # =========================================
+            created = False
         else:
-            stmt = (
-                select(Conversation)
-                .join(ConvParticipant)
-                .where(
-                    Conversation.type == ConvType.direct,
-                    ConvParticipant.user_id.in_([current_me, data.recipient_id]),
-                )
-                .group_by(Conversation.id)
-                .having(func.count(ConvParticipant.user_id) == 2)
-                .limit(1)
+            conv_id, created = await get_or_create_direct_conv(
+                session, current_me, data.recipient_id
             )
 
-            conv = await session.scalar(stmt)
-
-            if not conv:
-                conv = Conversation(type=ConvType.direct)
-                session.add(conv)
-                await session.flush()
-
-                session.add_all(
-                    [
-                        ConvParticipant(conv_id=conv.id, user_id=current_me),
-                        ConvParticipant(conv_id=conv.id, user_id=data.recipient_id),
-                        ConvReadState(conv_id=conv.id, user_id=current_me),
-                        ConvReadState(conv_id=conv.id, user_id=data.recipient_id),
-                    ]
-                )
-
-                await session.flush()
-
         # ===============================
         # Create message (luôn chạy)
         # ===============================
-        message = Message(
-            conv_id=conv.id,
-            sender_user_id=current_me,
-            content=data.content,
-            img_url=data.img_url,
+        message = await self._insert_message(session, conv_id, current_me, data)
+
+        # Realtime event, committed atomically with the message
+        add_user_event(
+            session,
+            [data.recipient_id],
+            {
+                "event": "new_message",
+                "message_id": str(message.id),
+                "conv_id": str(conv_id),
+                "sender_id": str(current_me),
+                "content": message.content,
+                "img_url": message.img_url,
+                "media": variant_urls(message.media_id) if message.media_id else None,
+                "seq": message.seq,
+                "created_at": message.created_at.isoformat(),
+            },
         )
 
-        session.add(message)
-        await session.flush()
-
-        # Update conversation metadata
-        conv.last_message_at = message.created_at
-        conv.last_message_id = message.id
-
-        # Update sender read state
-        stmt = select(ConvReadState).where(
-            ConvReadState.conv_id == conv.id,
-            ConvReadState.user_id == current_me,
-        )
-        read_state = await session.scalar(stmt)
-
-        if read_state:
-            read_state.last_message_id = message.id
-
         await session.commit()
+        outbox_relay.notify()
+        await recent_messages.push(message)
 
-        # Publish Redis event
-        await redis_client.publish(
-            "broadcast",
-            json.dumps(
-                {
-                    "key": f"user:{data.recipient_id}",
-                    "data": {
-                        "event": "new_message",
-                        "message_id": str(message.id),
-                        "conv_id": str(conv.id),
-                        "sender_id": str(current_me),
-                        "content": message.content,
-                        "img_url": message.img_url,
-                        "created_at": message.created_at.isoformat(),
-                    },
-                }
-            ),
-        )
+        if created:
+            await cache_created(current_me, data.recipient_id, conv_id)
 
         return message
 
@@ -156,85 +113,280 @@ class MessageService:
     ) -> Message:
 
         # ---------- Validate ----------
-        if not data.content and not data.img_url:
+        if not data.content and not data.img_url and not data.media_id:
             raise HTTPException(
                 status_code=400,
                 detail="Message must have content or image",
             )
 
-        # ---------- Get conversation ----------
-        conv = await session.get(Conversation, data.conv_id)
+        # ---------- Conversation + membership (cached) ----------
+        members = await conv_members.get(session, data.conv_id)
 
-        if not conv or conv.type != ConvType.group:
+        if not members or members.type != ConvType.group:
             raise HTTPException(status_code=404, detail="Group not found")
 
-        # ---------- Check membership ----------
-        stmt = select(ConvParticipant).where(
-            ConvParticipant.conv_id == conv.id,
-            ConvParticipant.user_id == current_me,
-        )
-        participant = await session.scalar(stmt)
-
-        if not participant:
+        if current_me not in members.user_ids:
             raise HTTPException(status_code=403, detail="Not a group member")
 
         # ---------- Create message ----------
-        message = Message(
-            conv_id=conv.id,
-            sender_user_id=current_me,
-            content=data.content,
-            img_url=data.img_url,
-        )
+        message = await self._insert_message(session, data.conv_id, current_me, data)
 
-        session.add(message)
-        await session.flush()
+        # ---------- Realtime event (outbox) ----------
+        payload = {
+            "event": "new_message",
+            "message_id": str(message.id),
+            "conv_id": str(data.conv_id),
+            "sender_id": str(current_me),
+            "content": message.content,
+            "img_url": message.img_url,
+            "media": variant_urls(message.media_id) if message.media_id else None,
+            "seq": message.seq,
+            "created_at": message.created_at.isoformat(),
+        }
 
-        # ---------- Update conversation metadata ----------
-        conv.last_message_id = message.id
-        conv.last_message_at = message.created_at
+        # Published once for the whole group, expanded by the WS nodes
+        add_conv_event(session, data.conv_id, payload, exclude=[current_me])
 
-        # ---------- Update sender read state ----------
-        stmt = select(ConvReadState).where(
-            ConvReadState.conv_id == conv.id,
-            ConvReadState.user_id == current_me,
+        await session.commit()
+        outbox_relay.notify()
+        await recent_messages.push(message)
+
+        return message
+
+    async def search_messages(
+        self,
+        user_id: UUID,
+        q: str,
+        session: AsyncSession,
+        mode: SearchMode = SearchMode.words,
+        conv_id: UUID | None = None,
+        cursor: UUID | None = None,
+        limit: int = Config.SEARCH_PAGE_SIZE,
+    ) -> MessageSearchResponse:
+        """Newest matches first, in the caller's conversations only.
+
+        Matching runs on the GIN indexes (search_vector for words/prefix,
+        trigram on content for substring); the keyset on the time-ordered
+        id (through created_at, its timestamp) keeps deep pages as cheap as
+        the first and skips partitions newer than the cursor.
+        """
+        q = q.strip()
+        member_convs = select(ConvParticipant.conv_id).where(
+            ConvParticipant.user_id == user_id
         )
 
-        read_state = await session.scalar(stmt)
+        stmt = select(
+            Message.id,
+            Message.conv_id,
+            Message.sender_user_id,
+            Message.seq,
+            Message.created_at,
+        ).where(Message.conv_id.in_(member_convs))
+
+        if mode == SearchMode.substring:
+            # Trigram index needs at least one full trigram
+            if len(q) < 3:
+                raise HTTPException(
+                    status_code=400, detail="Search needs at least 3 characters"
+                )
+            escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            stmt = stmt.add_columns(Message.content).where(
+                Message.content.ilike(f"%{escaped}%", escape="\\")
+            )
+        else:
+            words = re.findall(r"\w+", q)
+            if not words:
+                raise HTTPException(status_code=400, detail="Nothing to search for")
 
-        if read_state:
-            read_state.last_message_id = message.id
+            if mode == SearchMode.prefix:
+                tsquery = func.to_tsquery(
+                    SEARCH_CONFIG, " & ".join(f"{word}:*" for word in words)
+                )
+            else:
+                tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+
+            # Only computed for the rows of this page
+            headline = func.ts_headline(
+                SEARCH_CONFIG,
+                # Markers inside the text itself would forge highlights
+                func.translate(
+                    func.coalesce(Message.content, ""), START_SEL + STOP_SEL, ""
+                ),
+                tsquery,
+                HEADLINE_OPTIONS,
+            )
+            stmt = stmt.add_columns(headline).where(SEARCH_VECTOR.op("@@")(tsquery))
 
-        await session.commit()
+        if conv_id:
+            stmt = stmt.where(Message.conv_id == conv_id)
+
+        if cursor:
+            try:
+                cursor_at = uuid7_time(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+
+            # created_at is the id's timestamp: newer partitions are pruned
+            stmt = stmt.where(tuple_(Message.created_at, Message.id) < (cursor_at, cursor))
+
+        stmt = stmt.order_by(desc(Message.created_at), desc(Message.id))
+        result = await session.exec(stmt.limit(limit + 1))
+        rows = result.all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = str(rows[-1].id)
+
+        results = [
+            MessageSearchResult(
+                _id=row[0],
+                conversationId=row[1],
+                senderId=row[2],
+                seq=row[3],
+                createdAt=row[4],
+                snippet=(
+                    _highlight(row[5] or "", q)
+                    if mode == SearchMode.substring
+                    else _escape_headline(row[5] or "")
+                ),
+            )
+            for row in rows
+        ]
 
-        # ---------- Get other members ----------
-        stmt = select(ConvParticipant.user_id).where(
-            ConvParticipant.conv_id == conv.id,
-            ConvParticipant.user_id != current_me,
+        return MessageSearchResponse(results=results, nextCursor=next_cursor)
+
+    async def export_messages(
+        self,
+        user_id: UUID,
+        session: AsyncSession,
+        conv_id: UUID | None = None,
+        compress: bool = False,
+    ):
+        """A conversation's full history, or every message the user sent.
+
+        The user's conversations are the current ones plus any with a hot
+        message from them. One left with all of the user's messages
+        already archived is not found: chunks don't index senders.
+        """
+        if conv_id:
+            members = await conv_members.get(session, conv_id)
+            if not members or user_id not in members.user_ids:
+                raise HTTPException(status_code=403, detail="Not a conversation member")
+            return stream_messages([conv_id], compress=compress)
+
+        result = await session.exec(
+            select(ConvParticipant.conv_id)
+            .where(ConvParticipant.user_id == user_id)
+            .union(
+                select(Message.conv_id).where(Message.sender_user_id == user_id)
+            )
+        )
+        return stream_messages(
+            result.scalars().all(), sender_id=user_id, compress=compress
         )
 
-        result = await session.exec(stmt)
-        receivers = result.all()
+    async def _insert_message(
+        self,
+        session: AsyncSession,
+        conv_id: UUID,
+        sender_id: UUID,
+        data: CreateDirectMessage | CreateGroupMessage,
+    ) -> Message:
+        # Uploaded image: clients get a bounded variant, not the original.
+        # Checked before the seq is taken, so a rejected send holds no lock
+        img_url = data.img_url
+        if data.media_id:
+            media = await usable_media(session, data.media_id, sender_id)
+            img_url = variant_url(media.id, "medium")
+
+        # Next seq; the row lock taken here serializes senders of the same
+        # conversation until commit, so seqs commit in order without gaps.
+        # The id comes from the database clock too, not from this node's
+        result = await session.exec(
+            update(Conversation)
+            .where(Conversation.id == conv_id)
+            .values(last_seq=Conversation.last_seq + 1)
+            .returning(Conversation.last_seq, func.uuidv7())
+        )
+        seq, message_id = result.one()
 
-        # ---------- Publish Redis ----------
-        payload = {
-            "event": "new_message",
-            "message_id": str(message.id),
-            "conv_id": str(conv.id),
-            "sender_id": str(current_me),
-            "content": message.content,
-            "img_url": message.img_url,
-            "created_at": message.created_at.isoformat(),
-        }
+        # created_at comes from the id, which routes the row to its partition
+        message = Message(
+            id=message_id,
+            conv_id=conv_id,
+            sender_user_id=sender_id,
+            content=data.content,
+            img_url=img_url,
+            media_id=data.media_id,
+            seq=seq,
+            created_at=uuid7_time(message_id),
+        )
 
-        for uid in receivers:
-            await redis_client.publish(
-                "broadcast",
-                json.dumps(
-                    {
-                        "key": f"user:{uid}",
-                        "data": payload,
-                    }
-                ),
+        session.add(message)
+        await session.flush()
+
+        # Update conversation metadata
+        await session.exec(
+            update(Conversation)
+            .where(Conversation.id == conv_id)
+            .values(last_message_at=message.created_at, last_message_id=message.id)
+        )
+
+        # Update sender read state
+        await session.exec(
+            update(ConvReadState)
+            .where(
+                ConvReadState.conv_id == conv_id,
+                ConvReadState.user_id == sender_id,
             )
+            .values(last_message_id=message.id, read_seq=seq)
+        )
+
+        await record_message(session, message)
 
         return message
+
+
+# Generated tsvector column, managed by migration 7d3a9c1e5f28 and left
+# unmapped on Message so history pages don't fetch it
+SEARCH_VECTOR = literal_column("message.search_vector")
+
+# No stemming or stop words: messages mix languages
+SEARCH_CONFIG = literal_column("'simple'::regconfig")
+
+# Control characters as match markers: the headline is HTML-escaped first
+# and only then are they turned into <mark> tags
+START_SEL = "\x02"
+STOP_SEL = "\x03"
+
+HEADLINE_OPTIONS = (
+    f"StartSel=\"{START_SEL}\", StopSel=\"{STOP_SEL}\", MaxWords=20, MinWords=5, "
+    "MaxFragments=2, FragmentDelimiter=\" ... \""
+)
+
+
+def _escape_headline(headline: str) -> str:
+    return (
+        html.escape(headline)
+        .replace(START_SEL, "<mark>")
+        .replace(STOP_SEL, "</mark>")
+    )
+
+
+def _highlight(content: str, q: str) -> str:
+    index = content.lower().find(q.lower())
+    if index < 0:
+        return html.escape(content[: Config.SEARCH_SNIPPET_LENGTH])
+
+    start = max(index - Config.SEARCH_SNIPPET_LENGTH // 2, 0)
+    end = index + len(q)
+    return (
+        ("..." if start > 0 else "")
+        + html.escape(content[start:index])
+        + "<mark>"
+        + html.escape(content[index:end])
+        + "</mark>"
+        + html.escape(content[end : end + Config.SEARCH_SNIPPET_LENGTH // 2])
+        + ("..." if end + Config.SEARCH_SNIPPET_LENGTH // 2 < len(content) else "")
+    )
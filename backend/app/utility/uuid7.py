@@ -0,0 +1,60 @@
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+# UUIDv7 (RFC 9562): 48-bit unix ms timestamp, version, 12-bit counter,
+# variant, 62 random bits. Ids sort by creation time, so inserts append to
+# the right edge of the primary key index instead of a random page.
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+def _uuid7() -> UUID:
+    global _last_ms, _counter
+
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            _last_ms = ms
+            _counter = int.from_bytes(os.urandom(2), "big") & 0x7FF
+        else:
+            # Same (or earlier) millisecond: keep ids of this process monotonic
+            _counter += 1
+            if _counter > 0xFFF:
+                _last_ms += 1
+                _counter = 0
+        ms = _last_ms
+        counter = _counter
+
+    rand = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    value = (ms << 80) | (0x7 << 76) | (counter << 64) | (0b10 << 62) | rand
+    return UUID(int=value)
+
+
+# Python 3.14+ ships its own
+uuid7 = getattr(uuid, "uuid7", _uuid7)
+
+
+def uuid7_time(value: UUID) -> datetime:
+    """Millisecond timestamp encoded in a UUIDv7.
+
+    Raises ValueError for any other UUID: ids come from clients too, and a
+    uuid4's leading bits are no timestamp (often not even a valid year).
+    """
+    if value.version != 7:
+        raise ValueError(f"Not a UUIDv7: {value}")
+    try:
+        return datetime.fromtimestamp((value.int >> 80) / 1000, tz=timezone.utc)
+    except (OverflowError, OSError) as e:
+        raise ValueError(f"Not a UUIDv7: {value}") from e
+
+
+def uuid7_time_range(value: UUID) -> tuple[datetime, datetime]:
+    """[start, end) of the millisecond a UUIDv7 was generated in."""
+    start = uuid7_time(value)
+    return start, start + timedelta(milliseconds=1)
@@ -0,0 +1,123 @@
+import json
+import time
+
+from ..config import Config
+
+
+def parse_event_id(event_id: str) -> tuple[int, int] | None:
+    """Stream ids look like '<ms>-<seq>'. Returns None if malformed."""
+    try:
+        ms, seq = event_id.split("-", 1)
+        return int(ms), int(seq)
+    except (AttributeError, ValueError):
+        return None
+
+
+class EventLog:
+    """Durable, capped logs of realtime events (Redis Streams).
+
+    Pub/sub delivery is fire-and-forget. Every durable event is also
+    appended to a stream: the recipient's own log for per-user events, or
+    the conversation's log for group events, which are written once for
+    all members. A client that reconnects with the last event id it saw
+    is replayed what it missed from all of its streams instead of
+    reloading the inbox. Stream ids come from the Redis clock, so they are
+    compared across streams as time watermarks.
+    """
+
+    def __init__(
+        self,
+        redis,
+        maxlen: int = Config.EVENT_LOG_MAXLEN,
+        ttl_seconds: int = Config.EVENT_LOG_TTL_SECONDS,
+        replay_limit: int = Config.EVENT_LOG_REPLAY_LIMIT,
+    ):
+        self.redis = redis
+        self.maxlen = maxlen
+        self.ttl_seconds = ttl_seconds
+        self.replay_limit = replay_limit
+
+    def _key(self, client_id: str):
+        return f"events:user:{client_id}"
+
+    def _conv_key(self, conv_id: str):
+        return f"events:conv:{conv_id}"
+
+    def _append(self, pipe, key: str, data: dict):
+        pipe.xadd(
+            key,
+            {"data": json.dumps(data)},
+            maxlen=self.maxlen,
+            approximate=True,
+        )
+        pipe.expire(key, self.ttl_seconds)
+
+    def append(self, pipe, client_id: str, data: dict):
+        """Queue the append on a pipeline, the reply is the new event id."""
+        self._append(pipe, self._key(client_id), data)
+
+    def append_conv(self, pipe, conv_id: str, data: dict):
+        self._append(pipe, self._conv_key(conv_id), data)
+
+    async def replay(
+        self,
+        client_id: str,
+        last_event_id: str | None,
+        conv_ids: list[str] | None = None,
+    ) -> tuple[list[dict] | None, str | None]:
+        """Events after last_event_id and the current head id.
+
+        Returns None instead of the list when the gap cannot be replayed
+        (no or bad id, older than the log retention, a stream trimmed past
+        it, or too many events), in which case the client has to do a full
+        sync.
+        """
+        keys = [self._key(client_id)] + [self._conv_key(c) for c in conv_ids or []]
+        last = parse_event_id(last_event_id) if last_event_id else None
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.xinfo_stream(key)
+                if last is not None:
+                    pipe.xrange(
+                        key, f"({last[0]}-{last[1]}", "+", count=self.replay_limit + 1
+                    )
+            # Missing streams come back as errors instead of failing the batch
+            results = await pipe.execute(raise_on_error=False)
+
+        step = 2 if last is not None else 1
+        infos = [
+            info if isinstance(info, dict) else None for info in results[::step]
+        ]
+
+        heads = [info["last-generated-id"] for info in infos if info]
+        head_id = max(heads, key=parse_event_id) if heads else None
+
+        if last is None:
+            return None, head_id
+
+        # A stream idle for longer than the retention may have expired
+        if last[0] < (time.time() - self.ttl_seconds) * 1000:
+            return None, head_id
+
+        missed = []
+        for info, entries in zip(infos, results[1::step]):
+            if info is None:
+                continue
+            # Trimmed streams lost everything before their first entry
+            trimmed = info["entries-added"] > info["length"]
+            first = info["first-entry"]
+            if trimmed and first and parse_event_id(first[0]) > last:
+                return None, head_id
+            missed.extend(entries)
+
+        if len(missed) > self.replay_limit:
+            return None, head_id
+
+        missed.sort(key=lambda entry: parse_event_id(entry[0]))
+        events = []
+        for event_id, fields in missed:
+            data = json.loads(fields["data"])
+            data["event_id"] = event_id
+            events.append(data)
+        return events, head_id
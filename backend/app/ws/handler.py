@@ -1,37 +1,129 @@
+import asyncio
 import logging
+from uuid import UUID
+
+from ..config import Config
+from ..conversations.services import ConvServices
+from ..core.session import AsyncSessionLocal
+from ..friends.services import FriendshipService
 
 logger = logging.getLogger(__name__)
 
 
 class WSHandler:
-    def __init__(self, manager, redis_store):
+    def __init__(
+        self,
+        manager,
+        redis_store,
+        publisher,
+        event_log,
+        channels,
+        debounce_seconds: float = Config.PRESENCE_DEBOUNCE_SECONDS,
+    ):
         self.manager = manager
         self.redis_store = redis_store
+        self.publisher = publisher
+        self.event_log = event_log
+        self.channels = channels
+        self.debounce_seconds = debounce_seconds
+        self.friendship = FriendshipService()
+        self.conv_service = ConvServices()
+        self._pending_offline: dict[str, asyncio.Task] = {}
 
-    async def connect(self, websocket, client_id: str):
-        await self.manager.connect(client_id, websocket)
-        await self.manager.broadcast(
-            {"type": "presence", "client_id": client_id, "status": "online"}
-        )
+    def _presence_key(self, client_id: str):
+        return f"presence:{client_id}"
 
-        conn_id = await self.redis_store.add_connection(client_id)
+    async def connect(self, websocket, client_id: str, last_event_id: str | None = None):
+        # Paused until the replay is known, so missed events go out first
+        await self.manager.connect(client_id, websocket, paused=True)
 
-        if await self.redis_store.count(client_id) == 1:
-            logger.info(f"[ONLINE] client_id {client_id}")
-        return conn_id
+        conn_id = None
+        try:
+            conn_id, count = await self.redis_store.add_connection(client_id)
 
-    async def disconnect(self, websocket, client_id: str, conn_id: str):
-        await self.manager.disconnect(client_id, websocket)
+            pending = self._pending_offline.pop(client_id, None)
+            if pending is not None:
+                pending.cancel()
 
-        await self.manager.broadcast(
-            {
-                "type": "presence",
-                "client_id": client_id,
-                "status": "offline",
-            }
-        )
+            async with AsyncSessionLocal() as session:
+                friend_ids = await self.friendship.friend_ids(client_id, session)
+                groups = await self.conv_service.group_conv_ids(UUID(client_id), session)
+            group_ids = [str(conv_id) for conv_id in groups]
+
+            # Subscribe before reading the replay so nothing falls in between
+            await self.channels.join(client_id, group_ids)
 
-        await self.redis_store.remove_connection(client_id, conn_id)
+            if count == 1:
+                logger.info(f"[ONLINE] client_id {client_id}")
+                await self._announce(client_id, "online", friend_ids)
+
+            # Let the new socket know which friends are already online
+            online = await self.redis_store.online_among([str(f) for f in friend_ids])
+            self.manager.send_to_socket(
+                client_id, websocket, {"type": "presence_snapshot", "online": online}
+            )
+
+            replay, head_id = await self.event_log.replay(
+                client_id, last_event_id, group_ids
+            )
+            self.manager.send_to_socket(
+                client_id,
+                websocket,
+                {
+                    "type": "sync",
+                    # "full": the gap could not be replayed, reload the inbox
+                    "mode": "replay" if replay is not None else "full",
+                    "last_event_id": replay[-1]["event_id"] if replay else head_id,
+                },
+            )
+            self.manager.resume(client_id, websocket, replay)
+            return conn_id
+        except BaseException:
+            # Half connected (say the DB failed after the lease was written):
+            # undo it, or the heartbeat would keep the lease alive forever
+            await self.disconnect(websocket, client_id, conn_id)
+            raise
+
+    async def disconnect(self, websocket, client_id: str, conn_id: str | None):
+        await self.manager.disconnect(client_id, websocket)
+        if client_id not in self.manager.active_connections:
+            await self.channels.leave(client_id)
 
-        if await self.redis_store.count(client_id) == 0:
+        # None: connect failed before the lease was written
+        if conn_id is None:
+            return
+
+        if await self.redis_store.remove_connection(client_id, conn_id) == 0:
             logger.info(f"[DISCONNECT] client_id {client_id} disconnected")
+            # Debounce: a quick reconnect cancels the offline announcement
+            self._pending_offline[client_id] = asyncio.create_task(
+                self._offline_later(client_id)
+            )
+
+    async def _offline_later(self, client_id: str):
+        await asyncio.sleep(self.debounce_seconds)
+        self._pending_offline.pop(client_id, None)
+        await self.announce_offline(client_id)
+
+    async def announce_offline(self, client_id: str):
+        # The user may have come back on another node in the meantime
+        if await self.redis_store.count(client_id) > 0:
+            return
+
+        async with AsyncSessionLocal() as session:
+            friend_ids = await self.friendship.friend_ids(client_id, session)
+        await self._announce(client_id, "offline", friend_ids)
+
+    async def _announce(self, client_id: str, status: str, friend_ids):
+        # Only real transitions go out: the last announced state is shared by
+        # all nodes, so flapping between nodes never repeats a status
+        previous = await self.redis_store.redis.set(
+            self._presence_key(client_id), status, get=True
+        )
+        if previous == status:
+            return
+
+        await self.publisher.publish(
+            friend_ids,
+            {"type": "presence", "client_id": client_id, "status": status},
+        )
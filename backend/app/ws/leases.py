@@ -0,0 +1,64 @@
+import asyncio
+import logging
+
+from .handler import WSHandler
+from .redis_store import RedisConnectionStore
+
+logger = logging.getLogger(__name__)
+
+REAPER_LOCK_KEY = "ws:reaper:lock"
+
+
+class LeaseKeeper:
+    """Heartbeat this node's connection leases and reap crashed nodes.
+
+    Heartbeats run every third of the lease TTL, so one missed beat never
+    expires a live connection. Reaping is guarded by a short Redis lock so
+    only one node does it per round.
+    """
+
+    def __init__(self, store: RedisConnectionStore, handler: WSHandler):
+        self.store = store
+        self.handler = handler
+        self.interval = store.lease_ttl_ms / 3000
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="ws-lease-keeper")
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.store.heartbeat()
+                await self._reap()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Lease keeper error: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def _reap(self):
+        got_lock = await self.store.redis.set(
+            REAPER_LOCK_KEY,
+            self.store.node_id,
+            nx=True,
+            px=int(self.interval * 1000),
+        )
+        if not got_lock:
+            return
+
+        for client_id in await self.store.reap_dead_nodes():
+            logger.info(f"[REAPED] client_id {client_id}")
+            await self.handler.announce_offline(client_id)
@@ -1,23 +1,233 @@
-from collections import defaultdict
+import asyncio
+import enum
+import logging
+from collections import defaultdict, deque
 
 from starlette.websockets import WebSocket
 
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class SlowConsumerPolicy(str, enum.Enum):
+    drop_oldest = "drop_oldest"
+    coalesce = "coalesce"
+    disconnect = "disconnect"
+
+
+def coalesce_key(message: dict | str) -> str | None:
+    """Key under which a newer event makes a queued one obsolete."""
+    if not isinstance(message, dict):
+        return None
+
+    if message.get("type") == "presence":
+        return f"presence:{message.get('client_id')}"
+
+    if message.get("event") == "read-message":
+        return f"read:{message.get('conv_id')}:{message.get('seen_by')}"
+
+    return None
+
+
+def _replay_key(event: dict) -> tuple:
+    # Ids are unique per stream; the conversation tells the streams apart
+    return event.get("event_id"), event.get("conv_id"), event.get("event")
+
+
+class ClientConnection:
+    """One socket with a bounded outbound queue drained by its own writer task."""
+
+    def __init__(self, websocket: WebSocket, max_queue: int, policy: SlowConsumerPolicy):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.policy = policy
+        # Entries are mutable [key, message] cells so coalescing can swap
+        # the payload in place without moving it in the queue
+        self.queue: deque[list] = deque()
+        self.pending: dict[str, list] = {}
+        self.dropped = 0
+        self.closed = False
+        self.evicted = False
+        self.replayed: set[tuple] = set()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        # Referenced so it can't be garbage collected before it runs
+        self._evict_task: asyncio.Task | None = None
+
+    def start(self, replay: list[dict] | None = None):
+        if replay:
+            # Live events racing with the replay may already be part of it,
+            # both the ones queued so far and ones still in flight
+            self.replayed = {_replay_key(event) for event in replay}
+            live = [entry for entry in self.queue if not self._was_replayed(entry[1])]
+            self.queue = deque([[None, event] for event in replay] + live)
+            self.pending = {e[0]: e for e in live if e[0] is not None}
+            self._wakeup.set()
+
+        self._task = asyncio.create_task(self._writer())
+
+    async def stop(self):
+        self.closed = True
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def send(self, message: dict | str) -> bool:
+        """Enqueue without blocking. Returns False if the message was not queued."""
+        if self.closed:
+            return False
+
+        if self.replayed and self._was_replayed(message):
+            return True
+
+        key = coalesce_key(message)
+
+        if self.policy == SlowConsumerPolicy.coalesce and key in self.pending:
+            self.pending[key][1] = message
+            return True
+
+        if len(self.queue) >= self.max_queue:
+            if self.policy == SlowConsumerPolicy.disconnect:
+                self.closed = True
+                self._wakeup.set()
+                self._evict_task = asyncio.create_task(self._evict())
+                return False
+
+            self._forget(self.queue.popleft())
+            self.dropped += 1
+
+        entry = [key, message]
+        self.queue.append(entry)
+        if key is not None:
+            self.pending[key] = entry
+        self._wakeup.set()
+        return True
+
+    async def _writer(self):
+        try:
+            while not self.closed:
+                if not self.queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                entry = self.queue.popleft()
+                self._forget(entry)
+                message = entry[1]
+
+                if isinstance(message, str):
+                    await self.websocket.send_text(message)
+                else:
+                    await self.websocket.send_json(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"Writer stopped: {e}")
+            self.closed = True
+            # Nothing reaches this socket anymore: close it so the handler's
+            # receive loop ends and unregisters it
+            await self._close(code=1011)
+
+    def _was_replayed(self, message: dict | str) -> bool:
+        return isinstance(message, dict) and _replay_key(message) in self.replayed
+
+    def _forget(self, entry: list):
+        key = entry[0]
+        if key is not None and self.pending.get(key) is entry:
+            del self.pending[key]
+
+    async def _evict(self):
+        logger.warning("Disconnecting slow consumer")
+        self.evicted = True
+        await self._close(code=1013)
+
+    async def _close(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: dict[str, set[WebSocket]] = defaultdict(set)
+    def __init__(
+        self,
+        max_queue: int = Config.WS_SEND_QUEUE_SIZE,
+        policy: SlowConsumerPolicy = SlowConsumerPolicy(Config.WS_SLOW_CONSUMER_POLICY),
+    ):
+        self.max_queue = max_queue
+        self.policy = policy
+        self.active_connections: dict[str, dict[WebSocket, ClientConnection]] = (
+            defaultdict(dict)
+        )
+        # Counters of connections that already went away
+        self.dropped_total = 0
+        self.slow_disconnects_total = 0
 
-    async def connect(self, client_id: str, websocket: WebSocket):
+    async def connect(self, client_id: str, websocket: WebSocket, paused: bool = False):
+        """Register a socket. A paused one queues events until resume()."""
         await websocket.accept()
-        self.active_connections[client_id].add(websocket)
+        conn = ClientConnection(websocket, self.max_queue, self.policy)
+        if not paused:
+            conn.start()
+        self.active_connections[client_id][websocket] = conn
+
+    def resume(self, client_id: str, websocket: WebSocket, replay: list[dict] | None = None):
+        conn = self.active_connections.get(client_id, {}).get(websocket)
+        if conn is not None:
+            conn.start(replay)
 
     async def disconnect(self, client_id: str, websocket: WebSocket):
-        self.active_connections[client_id].discard(websocket)
+        conn = self.active_connections[client_id].pop(websocket, None)
+        if conn is not None:
+            self.dropped_total += conn.dropped
+            self.slow_disconnects_total += conn.evicted
+            await conn.stop()
 
         if not self.active_connections[client_id]:
             del self.active_connections[client_id]
 
+    async def send_message(self, client_id: str, message: dict | str):
+        # Direct dict lookup: only the sockets of this user are touched,
+        # and each send is a non-blocking enqueue
+        conns = self.active_connections.get(client_id)
+        if not conns:
+            return
+
+        for conn in conns.values():
+            conn.send(message)
+
+    def send_to_socket(self, client_id: str, websocket: WebSocket, message: dict | str):
+        conn = self.active_connections.get(client_id, {}).get(websocket)
+        if conn is not None:
+            conn.send(message)
+
     async def broadcast(self, message: dict):
         for conns in self.active_connections.values():
-            for ws in conns:
-                await ws.send_json(message)
+            for conn in conns.values():
+                conn.send(message)
+
+    def metrics(self) -> dict:
+        depths = [
+            len(conn.queue)
+            for conns in self.active_connections.values()
+            for conn in conns.values()
+        ]
+        dropped = self.dropped_total + sum(
+            conn.dropped
+            for conns in self.active_connections.values()
+            for conn in conns.values()
+        )
+        return {
+            "users": len(self.active_connections),
+            "connections": len(depths),
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "queue_capacity": self.max_queue,
+            "policy": self.policy.value,
+            "dropped_total": dropped,
+            "slow_disconnects_total": self.slow_disconnects_total,
+        }
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from uuid import UUID
+
+from sqlalchemy import delete, text
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .publisher import EventPublisher, conv_target, event_publisher, user_target
+from ..config import Config
+from ..core.model import OutboxEvent
+from ..core.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# pg advisory lock key, one relay drains at a time so per-conversation
+# order is kept across processes
+RELAY_LOCK_KEY = 0x6F7574626F78
+
+
+def add_user_event(
+    session: AsyncSession, user_ids: list[UUID | str], payload: dict, durable: bool = True
+):
+    """Stage an event for user_ids in the caller's transaction."""
+    session.add(OutboxEvent(target=user_target(user_ids), payload=payload, durable=durable))
+
+
+def add_conv_event(
+    session: AsyncSession,
+    conv_id: UUID | str,
+    payload: dict,
+    exclude: list[UUID | str] | None = None,
+    durable: bool = True,
+):
+    """Stage an event for a whole group conversation in the caller's transaction."""
+    session.add(
+        OutboxEvent(target=conv_target(conv_id, exclude), payload=payload, durable=durable)
+    )
+
+
+class OutboxRelay:
+    """Drain committed outbox rows to Redis in pipelined batches.
+
+    Handlers only write the outbox row and nudge the relay after their
+    commit, so Redis latency is off the request path and an event can't be
+    lost between commit and publish. Rows are deleted in the same
+    transaction that published them: a crash mid-batch republishes it
+    (at-least-once) rather than dropping it.
+    """
+
+    def __init__(
+        self,
+        publisher: EventPublisher,
+        batch_size: int = Config.OUTBOX_BATCH_SIZE,
+        poll_seconds: float = Config.OUTBOX_POLL_SECONDS,
+    ):
+        self.publisher = publisher
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def notify(self):
+        """Called after a commit that wrote outbox rows."""
+        self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="outbox-relay")
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                # Keep going while batches come back full
+                while await self.drain() == self.batch_size:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox relay error: {e}")
+
+            try:
+                # Other processes' rows are picked up by polling
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def drain(self) -> int:
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                locked = await session.scalar(
+                    text("SELECT pg_try_advisory_xact_lock(:key)"),
+                    params={"key": RELAY_LOCK_KEY},
+                )
+                if not locked:
+                    return 0
+
+                stmt = select(OutboxEvent).order_by(OutboxEvent.id).limit(self.batch_size)
+                result = await session.exec(stmt)
+                rows = result.all()
+                if not rows:
+                    return 0
+
+                await self.publisher.publish_batch(
+                    [
+                        {"target": r.target, "payload": r.payload, "durable": r.durable}
+                        for r in rows
+                    ]
+                )
+                await session.exec(
+                    delete(OutboxEvent).where(OutboxEvent.id.in_([r.id for r in rows]))
+                )
+                return len(rows)
+
+
+outbox_relay = OutboxRelay(event_publisher)
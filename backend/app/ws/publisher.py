@@ -0,0 +1,110 @@
+import json
+from uuid import UUID
+
+from .event_log import EventLog
+from .redis_store import RedisConnectionStore, node_channel
+from .subscriber import conv_channel
+from ..core.redis import redis_client
+
+
+def user_target(user_ids: list[UUID | str]) -> dict:
+    return {"users": [str(uid) for uid in user_ids]}
+
+
+def conv_target(conv_id: UUID | str, exclude: list[UUID | str] | None = None) -> dict:
+    return {"conv_id": str(conv_id), "exclude": [str(uid) for uid in exclude or []]}
+
+
+class EventPublisher:
+    """Publish realtime events only to the nodes holding the recipients.
+
+    An event is {"target": ..., "payload": ..., "durable": ...} where the
+    target is either a list of users, routed to the nodes holding them, or
+    a group conversation, published once and expanded by the nodes from
+    their cached membership. Durable events are also appended to the event
+    log so they can be replayed after a reconnect.
+    """
+
+    def __init__(self, store: RedisConnectionStore, event_log: EventLog):
+        self.store = store
+        self.event_log = event_log
+
+    async def publish(self, user_ids: list[UUID | str], data: dict, durable: bool = False):
+        await self.publish_batch(
+            [{"target": user_target(user_ids), "payload": data, "durable": durable}]
+        )
+
+    async def publish_conv(
+        self,
+        conv_id: UUID | str,
+        data: dict,
+        exclude: list[UUID | str] | None = None,
+        durable: bool = False,
+    ):
+        await self.publish_batch(
+            [{"target": conv_target(conv_id, exclude), "payload": data, "durable": durable}]
+        )
+
+    async def publish_batch(self, events: list[dict]):
+        """Publish many events in two pipelined round trips.
+
+        The first one appends durable events to the log and looks up the
+        nodes of every recipient, the second one does all the publishes.
+        """
+        # What each event needs from the first round trip, as reply offsets
+        plans = []
+        async with self.store.redis.pipeline(transaction=False) as pipe:
+            queued = 0
+            for event in events:
+                target, durable = event["target"], event["durable"]
+                plan = {"event_ids": {}, "lookups": {}}
+
+                if "conv_id" in target:
+                    if durable:
+                        self.event_log.append_conv(pipe, target["conv_id"], event["payload"])
+                        plan["event_id"] = queued
+                        queued += 2
+                else:
+                    for client_id in target["users"]:
+                        if durable:
+                            self.event_log.append(pipe, client_id, event["payload"])
+                            plan["event_ids"][client_id] = queued
+                            queued += 2
+                        self.store.queue_route_lookup(pipe, client_id)
+                        plan["lookups"][client_id] = queued
+                        queued += 1
+                plans.append(plan)
+
+            results = await pipe.execute() if queued else []
+
+        async with self.store.redis.pipeline(transaction=False) as pipe:
+            published = 0
+            for event, plan in zip(events, plans):
+                target, data = event["target"], event["payload"]
+
+                if "conv_id" in target:
+                    message = {**target, "data": data}
+                    if "event_id" in plan:
+                        message["event_id"] = results[plan["event_id"]]
+                    pipe.publish(conv_channel(target["conv_id"]), json.dumps(message))
+                    published += 1
+                    continue
+
+                routes = self.store.routes_from_members(
+                    {uid: results[i] for uid, i in plan["lookups"].items()}
+                )
+                for node_id, users in routes.items():
+                    message = {"users": sorted(users), "data": data}
+                    if plan["event_ids"]:
+                        message["event_ids"] = {
+                            uid: results[plan["event_ids"][uid]] for uid in users
+                        }
+                    pipe.publish(node_channel(node_id), json.dumps(message))
+                    published += 1
+
+            if published:
+                await pipe.execute()
+
+
+event_log = EventLog(redis_client)
+event_publisher = EventPublisher(RedisConnectionStore(redis_client), event_log)
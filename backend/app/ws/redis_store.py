@@ -1,25 +1,223 @@
+import os
+import socket
 import uuid
 
+from ..config import Config
+
+# Identity of this process in the cluster, used to route events to the node
+# that actually holds a user's sockets.
+NODE_ID = Config.NODE_ID or f"{socket.gethostname()}-{os.getpid()}"
+
+NODES_KEY = "ws:nodes"
+
+# All scripts read the clock from Redis so every node agrees on lease expiry.
+# A connection lives in ws:user:{id} as "<node_id>|<conn_id>" scored by the
+# time its lease runs out.
+
+_NOW = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+"""
+
+# KEYS: user key, node users key, nodes key
+# ARGV: member, ttl ms, client id, node id
+CONNECT_SCRIPT = _NOW + """
+local expiry = now + tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+redis.call('ZADD', KEYS[1], expiry, ARGV[1])
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+redis.call('SADD', KEYS[2], ARGV[3])
+redis.call('ZADD', KEYS[3], expiry, ARGV[4])
+return redis.call('ZCARD', KEYS[1])
+"""
+
+# KEYS: user key, node users key
+# ARGV: member, client id, node member prefix
+DISCONNECT_SCRIPT = _NOW + """
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local still_here = false
+for _, m in ipairs(redis.call('ZRANGE', KEYS[1], 0, -1)) do
+    if string.sub(m, 1, string.len(ARGV[3])) == ARGV[3] then
+        still_here = true
+        break
+    end
+end
+if not still_here then
+    redis.call('SREM', KEYS[2], ARGV[2])
+end
+return redis.call('ZCARD', KEYS[1])
+"""
+
+# KEYS: user key
+COUNT_SCRIPT = _NOW + """
+return redis.call('ZCOUNT', KEYS[1], now, '+inf')
+"""
+
+# KEYS: nodes key, user keys...
+# ARGV: ttl ms, node id, members... (one per user key)
+# Only refreshes leases that still exist, returns how many
+HEARTBEAT_SCRIPT = _NOW + """
+local expiry = now + tonumber(ARGV[1])
+local refreshed = 0
+redis.call('ZADD', KEYS[1], expiry, ARGV[2])
+for i = 2, #KEYS do
+    -- XX: a connection removed since the caller took its snapshot stays removed
+    refreshed = refreshed + redis.call('ZADD', KEYS[i], 'XX', 'CH', expiry, ARGV[i + 1])
+    redis.call('PEXPIRE', KEYS[i], ARGV[1])
+end
+return refreshed
+"""
+
+# KEYS: nodes key
+# Returns node ids whose lease ran out
+DEAD_NODES_SCRIPT = _NOW + """
+return redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now)
+"""
+
+# KEYS: user key
+# Drops expired leases, returns how many are left
+PRUNE_SCRIPT = _NOW + """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+return redis.call('ZCARD', KEYS[1])
+"""
+
+
+def node_channel(node_id: str) -> str:
+    return f"ws:node:{node_id}"
+
 
 class RedisConnectionStore:
-    def __init__(self, redis):
-        self. redis = redis
+    """Lease-based registry of live WebSocket connections.
+
+    Every connection holds a lease refreshed by this node's heartbeat. If a
+    node dies its leases expire, so counts stay correct even before the
+    reaper cleans up after it.
+    """
+
+    def __init__(
+        self,
+        redis,
+        node_id: str = NODE_ID,
+        lease_ttl_seconds: float = Config.WS_LEASE_TTL_SECONDS,
+    ):
+        self.redis = redis
+        self.node_id = node_id
+        self.lease_ttl_ms = int(lease_ttl_seconds * 1000)
+        # conn_id -> client_id of the connections held by this process
+        self.local: dict[str, str] = {}
+
+        self._connect = redis.register_script(CONNECT_SCRIPT)
+        self._disconnect = redis.register_script(DISCONNECT_SCRIPT)
+        self._count = redis.register_script(COUNT_SCRIPT)
+        self._heartbeat = redis.register_script(HEARTBEAT_SCRIPT)
+        self._dead_nodes = redis.register_script(DEAD_NODES_SCRIPT)
+        self._prune = redis.register_script(PRUNE_SCRIPT)
 
     def _key(self, client_id: str):
         return f"ws:user:{client_id}"
 
-    async def add_connection(self, client_id: str) -> str:
+    def _node_users_key(self, node_id: str):
+        return f"ws:node:{node_id}:users"
+
+    def _member(self, conn_id: str):
+        return f"{self.node_id}|{conn_id}"
+
+    async def add_connection(self, client_id: str) -> tuple[str, int]:
+        """Register a connection. Returns its id and the user's new count."""
         conn_id = str(uuid.uuid4())
 
-        await self.redis.sadd(self._key(client_id), conn_id)
-        return conn_id
+        count = await self._connect(
+            keys=[self._key(client_id), self._node_users_key(self.node_id), NODES_KEY],
+            args=[self._member(conn_id), self.lease_ttl_ms, client_id, self.node_id],
+        )
+        self.local[conn_id] = client_id
+        return conn_id, count
+
+    async def remove_connection(self, client_id: str, conn_id: str) -> int:
+        """Drop a connection. Returns the user's remaining count."""
+        self.local.pop(conn_id, None)
 
-    async def remove_connection(self, client_id: str, conn_id: str):
-        await self.redis.srem(self._key(client_id), conn_id)
+        return await self._disconnect(
+            keys=[self._key(client_id), self._node_users_key(self.node_id)],
+            args=[self._member(conn_id), client_id, f"{self.node_id}|"],
+        )
 
     async def count(self, client_id: str) -> int:
-        return await self.redis.scard(self._key(client_id))
+        return await self._count(keys=[self._key(client_id)])
 
     async def is_online(self, client_id: str) -> bool:
         return (await self.count(client_id)) > 0
-    
+
+    async def online_among(self, client_ids: list[str]) -> list[str]:
+        if not client_ids:
+            return []
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for client_id in client_ids:
+                await self._count(keys=[self._key(client_id)], client=pipe)
+            results = await pipe.execute()
+
+        return [cid for cid, count in zip(client_ids, results) if count]
+
+    def queue_route_lookup(self, pipe, client_id: str):
+        """Queue the lookup on a pipeline, feed replies to routes_from_members."""
+        pipe.zrange(self._key(client_id), 0, -1)
+
+    async def nodes_for(self, client_ids: list[str]) -> dict[str, set[str]]:
+        """Map node_id -> client ids connected to it, in one round trip."""
+        if not client_ids:
+            return {}
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for client_id in client_ids:
+                self.queue_route_lookup(pipe, client_id)
+            results = await pipe.execute()
+
+        return self.routes_from_members(dict(zip(client_ids, results)))
+
+    @staticmethod
+    def routes_from_members(members: dict[str, list[str]]) -> dict[str, set[str]]:
+        routes: dict[str, set[str]] = {}
+        for client_id, conns in members.items():
+            for member in conns:
+                node_id = member.rsplit("|", 1)[0]
+                routes.setdefault(node_id, set()).add(client_id)
+        return routes
+
+    async def heartbeat(self, batch_size: int = 1000) -> int:
+        """Refresh the leases of this node and all its local connections."""
+        local = list(self.local.items())
+        refreshed = 0
+
+        # Always run once so the node lease itself is refreshed
+        for start in range(0, max(len(local), 1), batch_size):
+            batch = local[start : start + batch_size]
+            refreshed += await self._heartbeat(
+                keys=[NODES_KEY] + [self._key(client_id) for _, client_id in batch],
+                args=[self.lease_ttl_ms, self.node_id]
+                + [self._member(conn_id) for conn_id, _ in batch],
+            )
+        return refreshed
+
+    async def reap_dead_nodes(self) -> list[str]:
+        """Clean up after crashed nodes. Returns users that went offline."""
+        dead_nodes = await self._dead_nodes(keys=[NODES_KEY])
+        offline: list[str] = []
+
+        for node_id in dead_nodes:
+            if node_id == self.node_id:
+                continue
+
+            users = list(await self.redis.smembers(self._node_users_key(node_id)))
+            if users:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for client_id in users:
+                        await self._prune(keys=[self._key(client_id)], client=pipe)
+                    counts = await pipe.execute()
+                offline.extend(cid for cid, count in zip(users, counts) if count == 0)
+
+            await self.redis.delete(self._node_users_key(node_id))
+            await self.redis.zrem(NODES_KEY, node_id)
+
+        return offline
@@ -0,0 +1,123 @@
+import json
+import logging
+import time
+from uuid import UUID
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from .publisher import event_publisher
+from .schema import (
+    MarkSeenRequest,
+    SendDirectRequest,
+    SendGroupRequest,
+    TypingRequest,
+    WSAck,
+    WSAckError,
+    ws_request_adapter,
+)
+from ..conversations.members import conv_members
+from ..conversations.schema import MessageResponse
+from ..conversations.services import ConvServices
+from ..core.model import ConvType
+from ..core.session import AsyncSessionLocal
+from ..friends.services import FriendshipService
+from ..messages.services import MessageService
+
+logger = logging.getLogger(__name__)
+
+
+class WSRpc:
+    """Request/ack protocol over an already authenticated socket.
+
+    The socket was authenticated once at connect time, so these calls skip
+    the per-request middleware, JWT decoding and blocklist lookup that the
+    equivalent HTTP endpoints pay for.
+    """
+
+    def __init__(self):
+        self.message_service = MessageService()
+        self.conv_service = ConvServices()
+        self.friendship = FriendshipService()
+
+    async def dispatch(self, client_id: str, token_exp: int | None, raw: str) -> dict:
+        request_id = None
+        try:
+            try:
+                request_id = json.loads(raw).get("id")
+            except (ValueError, AttributeError):
+                pass
+
+            if token_exp is not None and token_exp < time.time():
+                raise HTTPException(status_code=401, detail="Token expired")
+
+            request = ws_request_adapter.validate_json(raw)
+            data = await self._handle(UUID(client_id), request)
+            ack = WSAck(id=request.id, ok=True, data=data)
+
+        except ValidationError as e:
+            ack = WSAck(
+                id=request_id,
+                ok=False,
+                error=WSAckError(status=422, detail=e.errors(include_url=False)),
+            )
+        except HTTPException as e:
+            ack = WSAck(
+                id=request_id,
+                ok=False,
+                error=WSAckError(status=e.status_code, detail=e.detail),
+            )
+        except Exception:
+            logger.exception(f"WS rpc failed for client_id {client_id}")
+            ack = WSAck(
+                id=request_id,
+                ok=False,
+                error=WSAckError(status=500, detail="Internal server error"),
+            )
+
+        return ack.model_dump(mode="json")
+
+    async def _handle(self, user_id: UUID, request):
+        async with AsyncSessionLocal() as session:
+            if isinstance(request, SendDirectRequest):
+                message = await self.message_service.send_direct_message(
+                    request.data, user_id, self.friendship, session
+                )
+                return MessageResponse.model_validate(message).model_dump(
+                    mode="json", by_alias=True
+                )
+
+            if isinstance(request, SendGroupRequest):
+                message = await self.message_service.send_group_message(
+                    request.data, user_id, session
+                )
+                return MessageResponse.model_validate(message).model_dump(
+                    mode="json", by_alias=True
+                )
+
+            if isinstance(request, MarkSeenRequest):
+                return await self.conv_service.mark_as_seen(
+                    request.data.conv_id, user_id, session
+                )
+
+            if isinstance(request, TypingRequest):
+                return await self._typing(user_id, request, session)
+
+    async def _typing(self, user_id: UUID, request: TypingRequest, session):
+        conv_id = request.data.conv_id
+        members = await conv_members.get(session, conv_id)
+        if not members or user_id not in members.user_ids:
+            raise HTTPException(status_code=403, detail="Not a conversation member")
+
+        payload = {
+            "event": "typing",
+            "conv_id": str(conv_id),
+            "user_id": str(user_id),
+            "is_typing": request.data.is_typing,
+        }
+
+        if members.type == ConvType.group:
+            await event_publisher.publish_conv(conv_id, payload, exclude=[user_id])
+        else:
+            await event_publisher.publish(list(members.user_ids - {user_id}), payload)
+        return None
@@ -0,0 +1,61 @@
+from typing import Annotated, Any, Literal, Union
+from uuid import UUID
+
+from pydantic import BaseModel, Field, TypeAdapter
+
+from ..messages.schema import CreateDirectMessage, CreateGroupMessage
+
+
+class MarkSeenData(BaseModel):
+    conv_id: UUID
+
+
+class TypingData(BaseModel):
+    conv_id: UUID
+    is_typing: bool = True
+
+
+class _WSRequest(BaseModel):
+    # Client generated, echoed back in the ack
+    id: str = Field(min_length=1, max_length=64)
+
+
+class SendDirectRequest(_WSRequest):
+    type: Literal["send_direct"]
+    data: CreateDirectMessage
+
+
+class SendGroupRequest(_WSRequest):
+    type: Literal["send_group"]
+    data: CreateGroupMessage
+
+
+class MarkSeenRequest(_WSRequest):
+    type: Literal["mark_seen"]
+    data: MarkSeenData
+
+
+class TypingRequest(_WSRequest):
+    type: Literal["typing"]
+    data: TypingData
+
+
+WSRequest = Annotated[
+    Union[SendDirectRequest, SendGroupRequest, MarkSeenRequest, TypingRequest],
+    Field(discriminator="type"),
+]
+
+ws_request_adapter = TypeAdapter(WSRequest)
+
+
+class WSAckError(BaseModel):
+    status: int
+    detail: Any
+
+
+class WSAck(BaseModel):
+    type: Literal["ack"] = "ack"
+    id: str | None
+    ok: bool
+    data: Any = None
+    error: WSAckError | None = None
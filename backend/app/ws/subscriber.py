@@ -0,0 +1,154 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+
+from .manager import ConnectionManager
+from .redis_store import NODE_ID, node_channel
+
+logger = logging.getLogger(__name__)
+
+CONV_CHANNEL_PREFIX = "ws:conv:"
+
+
+def conv_channel(conv_id: str) -> str:
+    return f"{CONV_CHANNEL_PREFIX}{conv_id}"
+
+
+class RedisSubscriber:
+    """Consume realtime events routed to this node and deliver them locally.
+
+    Two kinds of channels are consumed:
+
+    - the node channel, for events addressed to specific users. Publishers
+      only send to the nodes holding a recipient, so this work grows with
+      the users this node holds, not with the total traffic of the cluster.
+    - one channel per group conversation that has a member on this node.
+      A group event is published once and expanded here into per-socket
+      deliveries from the locally cached membership, so sending costs the
+      same whatever the size of the group.
+    """
+
+    def __init__(self, redis, manager: ConnectionManager, node_id: str = NODE_ID):
+        self.redis = redis
+        self.manager = manager
+        self.channel = node_channel(node_id)
+        # Group membership of the users connected to this node
+        self.conv_members: dict[str, set[str]] = defaultdict(set)
+        self.user_convs: dict[str, set[str]] = defaultdict(set)
+        self._pubsub = None
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="ws-redis-subscriber")
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def join(self, client_id: str, conv_ids: list[str]):
+        """Start expanding the given group conversations to client_id."""
+        new_channels = []
+        for conv_id in conv_ids:
+            if not self.conv_members[conv_id]:
+                new_channels.append(conv_channel(conv_id))
+            self.conv_members[conv_id].add(client_id)
+            self.user_convs[client_id].add(conv_id)
+
+        if new_channels and self._pubsub is not None:
+            await self._pubsub.subscribe(*new_channels)
+
+    async def leave(self, client_id: str):
+        """Forget client_id once its last local socket is gone."""
+        old_channels = []
+        for conv_id in self.user_convs.pop(client_id, set()):
+            members = self.conv_members.get(conv_id)
+            if members is None:
+                continue
+            members.discard(client_id)
+            if not members:
+                del self.conv_members[conv_id]
+                old_channels.append(conv_channel(conv_id))
+
+        if old_channels and self._pubsub is not None:
+            await self._pubsub.unsubscribe(*old_channels)
+
+    async def _run(self):
+        backoff = 1
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(
+                    self.channel, *[conv_channel(c) for c in self.conv_members]
+                )
+                self._pubsub = pubsub
+                logger.info(f"Subscribed to redis channel {self.channel}")
+                backoff = 1
+
+                async for raw in pubsub.listen():
+                    if raw["channel"].startswith(CONV_CHANNEL_PREFIX):
+                        await self._dispatch_conv(raw["data"])
+                    else:
+                        await self._dispatch(raw["data"])
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis subscriber error: {e}, retrying in {backoff}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                self._pubsub = None
+                await pubsub.aclose()
+
+    async def _dispatch(self, raw: str):
+        try:
+            event = json.loads(raw)
+            users: list[str] = event["users"]
+            data = event["data"]
+            event_ids: dict[str, str] = event.get("event_ids", {})
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"Dropping malformed realtime event: {raw!r}")
+            return
+
+        if data.get("event") == "conv_joined":
+            for client_id in users:
+                if client_id in self.manager.active_connections:
+                    await self.join(client_id, [data["conv_id"]])
+
+        for client_id in users:
+            message = data
+            if client_id in event_ids:
+                message = {**data, "event_id": event_ids[client_id]}
+            await self._deliver(client_id, message)
+
+    async def _dispatch_conv(self, raw: str):
+        try:
+            event = json.loads(raw)
+            conv_id: str = event["conv_id"]
+            data = event["data"]
+            exclude = set(event.get("exclude", []))
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"Dropping malformed conversation event: {raw!r}")
+            return
+
+        if "event_id" in event:
+            data = {**data, "event_id": event["event_id"]}
+
+        for client_id in list(self.conv_members.get(conv_id, ())):
+            if client_id not in exclude:
+                await self._deliver(client_id, data)
+
+    async def _deliver(self, client_id: str, message: dict):
+        try:
+            await self.manager.send_message(client_id, message)
+        except Exception as e:
+            logger.error(f"Failed to deliver event to client_id {client_id}: {e}")
@@ -1,17 +1,32 @@
-from fastapi import APIRouter, WebSocket
+from fastapi import APIRouter, Depends, WebSocket
 import jwt
+from jwt.exceptions import InvalidTokenError
 from starlette.websockets import WebSocketDisconnect
 
 from .handler import WSHandler
+from .leases import LeaseKeeper
 from .manager import ConnectionManager
-from .redis_store import RedisConnectionStore
+from .redis_store import RedisConnectionStore, NODE_ID
+from .publisher import event_publisher, event_log
+from .rpc import WSRpc
+from .subscriber import RedisSubscriber
+from ..auth.dependency import get_current_user
 from ..config import Config
-from ..core.redis import redis_client
+from ..core.redis import redis_client, token_in_jti_blocklist
 
 ws_router = APIRouter()
 manager = ConnectionManager()
 redis_store = RedisConnectionStore(redis_client)
-handler = WSHandler(manager, redis_store)
+subscriber = RedisSubscriber(redis_client, manager)
+handler = WSHandler(manager, redis_store, event_publisher, event_log, subscriber)
+lease_keeper = LeaseKeeper(redis_store, handler)
+rpc = WSRpc()
+
+
+# Node internals: signed-in users only
+@ws_router.get("/metrics", dependencies=[Depends(get_current_user)])
+async def ws_metrics():
+    return {"node_id": NODE_ID, **manager.metrics()}
 
 
 @ws_router.websocket("/")
@@ -22,18 +37,38 @@ async def ws_endpoint(websocket: WebSocket):
         await websocket.close(code=1008)
         return
 
-    payload = jwt.decode(token, Config.SECRET_KEY, algorithms=[f"{Config.ALGORITHM}"])
+    try:
+        payload = jwt.decode(
+            token, Config.SECRET_KEY, algorithms=[f"{Config.ALGORITHM}"]
+        )
+    except InvalidTokenError:
+        await websocket.close(code=1008)
+        return
+
     client_id = payload.get("user_id")
+    jti = payload.get("jti")
 
-    if not client_id:
+    # Auth happens once here; requests on the socket reuse it
+    if (
+        not client_id
+        or payload.get("refresh")
+        or jti is None
+        or await token_in_jti_blocklist(jti)
+    ):
         await websocket.close(code=1008)
+        return
 
-    conn_id = await handler.connect(websocket, client_id)
+    conn_id = await handler.connect(
+        websocket, client_id, websocket.query_params.get("last_event_id")
+    )
 
     try:
         while True:
             data = await websocket.receive_text()
 
-            await manager.send_message(client_id, data)
+            ack = await rpc.dispatch(client_id, payload.get("exp"), data)
+            manager.send_to_socket(client_id, websocket, ack)
     except WebSocketDisconnect:
+        pass
+    finally:
         await handler.disconnect(websocket, client_id, conn_id)
@@ -7,6 +7,10 @@ echo "Migrations completed successfully"
 
 echo "Starting Celery worker..."
 celery -A app.celery_task.c_app worker -l info &
+
+# Periodic tasks (message archive) are only sent by beat; exactly one per deployment
+echo "Starting Celery beat..."
+celery -A app.celery_task.c_app beat -l info -s /tmp/celerybeat-schedule &
 #CELERY_PID=$!
 
 echo "Starting FastAPI application..."
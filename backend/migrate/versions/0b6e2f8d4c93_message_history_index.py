@@ -0,0 +1,29 @@
+"""message history index
+
+Revision ID: 0b6e2f8d4c93
+Revises: f19c6d2b8a47
+Create Date: 2026-10-18 13:27:36.108452
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b6e2f8d4c93'
+down_revision: Union[str, Sequence[str], None] = 'f19c6d2b8a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('idx_message_conv_created', 'message', ['conv_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_message_conv_created', table_name='message')
@@ -0,0 +1,76 @@
+"""message uuid7
+
+Revision ID: 1c8f5a3e9b64
+Revises: 0b6e2f8d4c93
+Create Date: 2026-10-18 14:10:22.584019
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c8f5a3e9b64'
+down_revision: Union[str, Sequence[str], None] = '0b6e2f8d4c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # New v7 id per existing message: the ms timestamp comes from
+    # created_at and the 12-bit counter (after the version nibble 7) from the
+    # seq order within that millisecond, so paging by id keeps history order
+    op.execute(
+        """
+        CREATE TEMP TABLE message_id_map ON COMMIT DROP AS
+        SELECT
+            old_id,
+            encode(
+                overlay(
+                    overlay(
+                        uuid_send(gen_random_uuid())
+                        placing substring(int8send(ms) FROM 3)
+                        FROM 1 FOR 6
+                    )
+                    placing int2send((28672 + least(tie, 4095))::smallint)
+                    FROM 7 FOR 2
+                ),
+                'hex'
+            )::uuid AS new_id
+        FROM (
+            SELECT
+                id AS old_id,
+                floor(extract(epoch FROM created_at) * 1000)::bigint AS ms,
+                row_number() OVER (
+                    PARTITION BY conv_id, floor(extract(epoch FROM created_at) * 1000)
+                    ORDER BY seq
+                ) - 1 AS tie
+            FROM message
+        ) numbered
+        """
+    )
+
+    op.drop_constraint('fk_conv_last_message', 'conversation', type_='foreignkey')
+    op.drop_constraint('convreadstate_last_message_id_fkey', 'convreadstate', type_='foreignkey')
+
+    op.execute("UPDATE message m SET id = map.new_id FROM message_id_map map WHERE m.id = map.old_id")
+    op.execute("UPDATE conversation c SET last_message_id = map.new_id FROM message_id_map map WHERE c.last_message_id = map.old_id")
+    op.execute("UPDATE convreadstate r SET last_message_id = map.new_id FROM message_id_map map WHERE r.last_message_id = map.old_id")
+    op.execute("UPDATE user_inbox i SET last_message_id = map.new_id FROM message_id_map map WHERE i.last_message_id = map.old_id")
+
+    op.create_foreign_key('fk_conv_last_message', 'conversation', 'message', ['last_message_id'], ['id'])
+    op.create_foreign_key('convreadstate_last_message_id_fkey', 'convreadstate', 'message', ['last_message_id'], ['id'])
+
+    op.drop_index('idx_message_conv_created', table_name='message')
+    op.create_index('idx_message_conv_id', 'message', ['conv_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Rewritten ids stay valid UUIDs; only the index changes back
+    op.drop_index('idx_message_conv_id', table_name='message')
+    op.create_index('idx_message_conv_created', 'message', ['conv_id', 'created_at', 'id'], unique=False)
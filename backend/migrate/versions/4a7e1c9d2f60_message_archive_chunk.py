@@ -0,0 +1,46 @@
+"""message archive chunk
+
+Revision ID: 4a7e1c9d2f60
+Revises: 9e2b7d4a6c15
+Create Date: 2026-10-18 16:02:41.918305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a7e1c9d2f60'
+down_revision: Union[str, Sequence[str], None] = '9e2b7d4a6c15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'message_archive_chunk',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('conv_id', sa.Uuid(), nullable=False),
+        sa.Column('first_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('first_id', sa.Uuid(), nullable=False),
+        sa.Column('last_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('last_id', sa.Uuid(), nullable=False),
+        sa.Column('first_seq', sa.BigInteger(), nullable=False),
+        sa.Column('last_seq', sa.BigInteger(), nullable=False),
+        sa.Column('message_count', sa.Integer(), nullable=False),
+        sa.Column('path', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['conv_id'], ['conversation.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('idx_archive_chunk_conv_first', 'message_archive_chunk', ['conv_id', 'first_at', 'first_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_archive_chunk_conv_first', table_name='message_archive_chunk')
+    op.drop_table('message_archive_chunk')
@@ -0,0 +1,31 @@
+"""friend indexes
+
+Revision ID: 5b9d0e7f3a21
+Revises: 8a4e61d0c2b5
+Create Date: 2026-10-18 10:41:05.277314
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b9d0e7f3a21'
+down_revision: Union[str, Sequence[str], None] = '8a4e61d0c2b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('idx_friend_user_a_user_b', 'friend', ['user_a', 'user_b'], unique=False)
+    op.create_index('idx_friend_user_b', 'friend', ['user_b'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_friend_user_b', table_name='friend')
+    op.drop_index('idx_friend_user_a_user_b', table_name='friend')
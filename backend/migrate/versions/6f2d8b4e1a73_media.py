@@ -0,0 +1,50 @@
+"""media uploads
+
+Revision ID: 6f2d8b4e1a73
+Revises: 4a7e1c9d2f60
+Create Date: 2026-10-18 16:47:09.352817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f2d8b4e1a73'
+down_revision: Union[str, Sequence[str], None] = '4a7e1c9d2f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'media',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('sha256', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+        sa.Column('owner_id', sa.Uuid(), nullable=False),
+        sa.Column('content_type', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('width', sa.Integer(), nullable=False),
+        sa.Column('height', sa.Integer(), nullable=False),
+        sa.Column('status', sa.Enum('pending', 'ready', 'failed', name='mediastatus'), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('sha256'),
+    )
+
+    # Propagates to every partition
+    op.add_column('message', sa.Column('media_id', sa.Uuid(), nullable=True))
+    op.create_foreign_key('fk_message_media', 'message', 'media', ['media_id'], ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('fk_message_media', 'message', type_='foreignkey')
+    op.drop_column('message', 'media_id')
+    op.drop_table('media')
+    op.execute('DROP TYPE mediastatus')
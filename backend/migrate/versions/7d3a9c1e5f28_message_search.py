@@ -0,0 +1,44 @@
+"""message search
+
+Revision ID: 7d3a9c1e5f28
+Revises: 1c8f5a3e9b64
+Create Date: 2026-10-18 14:52:37.220913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3a9c1e5f28'
+down_revision: Union[str, Sequence[str], None] = '1c8f5a3e9b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    op.add_column('message', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('simple'::regconfig, coalesce(content, ''))", persisted=True),
+        nullable=True,
+    ))
+    op.create_index('idx_message_search_vector', 'message', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index(
+        'idx_message_content_trgm', 'message', ['content'], unique=False,
+        postgresql_using='gin', postgresql_ops={'content': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_message_content_trgm', table_name='message')
+    op.drop_index('idx_message_search_vector', table_name='message')
+    op.drop_column('message', 'search_vector')
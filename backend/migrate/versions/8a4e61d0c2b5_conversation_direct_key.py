@@ -0,0 +1,65 @@
+"""conversation direct_key
+
+Revision ID: 8a4e61d0c2b5
+Revises: 3f1c2a9b7d10
+Create Date: 2026-10-18 10:02:17.530961
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a4e61d0c2b5'
+down_revision: Union[str, Sequence[str], None] = '3f1c2a9b7d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('conversation', sa.Column('direct_key', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+
+    # Backfill the sorted pair key. If concurrent first messages already
+    # created duplicates, the oldest conversation keeps the key.
+    op.execute(
+        """
+        UPDATE conversation c
+        SET direct_key = pairs.direct_key
+        FROM (
+            SELECT
+                p.conv_id,
+                string_agg(p.user_id::text, ':' ORDER BY p.user_id) AS direct_key
+            FROM conv_participant p
+            JOIN conversation dc ON dc.id = p.conv_id AND dc.type = 'direct'
+            GROUP BY p.conv_id
+            HAVING count(*) = 2
+        ) pairs
+        WHERE c.id = pairs.conv_id
+        """
+    )
+    op.execute(
+        """
+        UPDATE conversation c
+        SET direct_key = NULL
+        FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY direct_key ORDER BY created_at, id
+            ) AS rn
+            FROM conversation
+            WHERE direct_key IS NOT NULL
+        ) ranked
+        WHERE c.id = ranked.id AND ranked.rn > 1
+        """
+    )
+
+    op.create_unique_constraint('conversation_direct_key_key', 'conversation', ['direct_key'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('conversation_direct_key_key', 'conversation', type_='unique')
+    op.drop_column('conversation', 'direct_key')
@@ -0,0 +1,34 @@
+"""receipt summary indexes
+
+Revision ID: 8c5a1f3d7e92
+Revises: 6f2d8b4e1a73
+Create Date: 2026-10-18 17:21:55.604193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c5a1f3d7e92'
+down_revision: Union[str, Sequence[str], None] = '6f2d8b4e1a73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('idx_conv_participant_joined', 'conv_participant', ['conv_id', 'joined_at', 'user_id'], unique=False)
+    op.create_index(
+        'idx_user_inbox_seen', 'user_inbox', ['conv_id', 'user_id'], unique=False,
+        postgresql_where=sa.text('unread = 0'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_user_inbox_seen', table_name='user_inbox')
+    op.drop_index('idx_conv_participant_joined', table_name='conv_participant')
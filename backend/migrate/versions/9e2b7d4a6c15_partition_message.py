@@ -0,0 +1,140 @@
+"""partition message by month
+
+Revision ID: 9e2b7d4a6c15
+Revises: 7d3a9c1e5f28
+Create Date: 2026-10-18 15:38:14.402766
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e2b7d4a6c15'
+down_revision: Union[str, Sequence[str], None] = '7d3a9c1e5f28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Months created ahead of now; the app's partition keeper takes over after
+MONTHS_AHEAD = 3
+
+COLUMNS = "id, conv_id, sender_user_id, content, img_url, seq, created_at, updated_at"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A partitioned table can't be the target of these foreign keys
+    op.drop_constraint('fk_conv_last_message', 'conversation', type_='foreignkey')
+    op.drop_constraint('convreadstate_last_message_id_fkey', 'convreadstate', type_='foreignkey')
+
+    op.rename_table('message', 'message_old')
+    for index in ('message_pkey', 'idx_message_conv_id', 'idx_message_conv_seq', 'idx_message_search_vector', 'idx_message_content_trgm'):
+        op.execute(f'ALTER INDEX {index} RENAME TO {index}_old')
+
+    op.execute(
+        """
+        CREATE TABLE message (
+            id uuid NOT NULL,
+            conv_id uuid NOT NULL REFERENCES conversation (id),
+            sender_user_id uuid NOT NULL REFERENCES "user" (id),
+            content varchar,
+            img_url varchar,
+            seq bigint NOT NULL,
+            created_at timestamp with time zone NOT NULL DEFAULT now(),
+            updated_at timestamp with time zone DEFAULT now(),
+            search_vector tsvector GENERATED ALWAYS AS (
+                to_tsvector('simple'::regconfig, coalesce(content, ''))
+            ) STORED,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+
+    # One partition per month from the oldest message to MONTHS_AHEAD
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            month timestamptz := date_trunc(
+                'month', coalesce((SELECT min(created_at) FROM message_old), now()), 'UTC'
+            );
+            last timestamptz := date_trunc('month', now(), 'UTC') + interval '{MONTHS_AHEAD} months';
+        BEGIN
+            WHILE month <= last LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF message FOR VALUES FROM (%L) TO (%L)',
+                    'message_' || to_char(month AT TIME ZONE 'UTC', 'YYYY_MM'),
+                    month,
+                    month + interval '1 month'
+                );
+                month := month + interval '1 month';
+            END LOOP;
+        END $$
+        """
+    )
+
+    # created_at becomes exactly the millisecond of the (v7) id, which is
+    # what lets queries derive the partition from a message id
+    op.execute(
+        f"""
+        INSERT INTO message ({COLUMNS})
+        SELECT
+            id, conv_id, sender_user_id, content, img_url, seq,
+            to_timestamp(
+                ('x' || substr(replace(id::text, '-', ''), 1, 12))::bit(48)::bigint / 1000.0
+            ),
+            updated_at
+        FROM message_old
+        """
+    )
+
+    op.drop_table('message_old')
+
+    # Created on the parent, so every partition (and future ones) gets them
+    op.create_index('idx_message_conv_created', 'message', ['conv_id', 'created_at', 'id'], unique=False)
+    op.create_index('idx_message_conv_seq', 'message', ['conv_id', 'seq'], unique=False)
+    op.create_index('idx_message_search_vector', 'message', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index(
+        'idx_message_content_trgm', 'message', ['content'], unique=False,
+        postgresql_using='gin', postgresql_ops={'content': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.rename_table('message', 'message_partitioned')
+    op.execute('ALTER INDEX message_pkey RENAME TO message_partitioned_pkey')
+    for index in ('idx_message_conv_created', 'idx_message_conv_seq', 'idx_message_search_vector', 'idx_message_content_trgm'):
+        op.execute(f'ALTER INDEX {index} RENAME TO {index}_partitioned')
+    op.execute(
+        """
+        CREATE TABLE message (
+            id uuid PRIMARY KEY,
+            conv_id uuid NOT NULL REFERENCES conversation (id),
+            sender_user_id uuid NOT NULL REFERENCES "user" (id),
+            content varchar,
+            img_url varchar,
+            seq bigint NOT NULL,
+            created_at timestamp with time zone DEFAULT now(),
+            updated_at timestamp with time zone DEFAULT now(),
+            search_vector tsvector GENERATED ALWAYS AS (
+                to_tsvector('simple'::regconfig, coalesce(content, ''))
+            ) STORED
+        )
+        """
+    )
+    op.execute(f"INSERT INTO message ({COLUMNS}) SELECT {COLUMNS} FROM message_partitioned")
+    op.execute('DROP TABLE message_partitioned CASCADE')
+
+    op.create_index('idx_message_conv_id', 'message', ['conv_id', 'id'], unique=False)
+    op.create_index('idx_message_conv_seq', 'message', ['conv_id', 'seq'], unique=True)
+    op.create_index('idx_message_search_vector', 'message', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index(
+        'idx_message_content_trgm', 'message', ['content'], unique=False,
+        postgresql_using='gin', postgresql_ops={'content': 'gin_trgm_ops'},
+    )
+    op.create_foreign_key('fk_conv_last_message', 'conversation', 'message', ['last_message_id'], ['id'])
+    op.create_foreign_key('convreadstate_last_message_id_fkey', 'convreadstate', 'message', ['last_message_id'], ['id'])
@@ -0,0 +1,32 @@
+"""archive chunk seq index
+
+Revision ID: a3d6e9b2c4f1
+Revises: 8c5a1f3d7e92
+Create Date: 2026-10-18 18:05:12.774310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d6e9b2c4f1'
+down_revision: Union[str, Sequence[str], None] = '8c5a1f3d7e92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # History pages and chunk lookups go by seq now
+    op.drop_index('idx_archive_chunk_conv_first', table_name='message_archive_chunk')
+    op.create_index('idx_archive_chunk_conv_seq', 'message_archive_chunk', ['conv_id', 'first_seq'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_archive_chunk_conv_seq', table_name='message_archive_chunk')
+    op.create_index('idx_archive_chunk_conv_first', 'message_archive_chunk', ['conv_id', 'first_at', 'first_id'], unique=False)
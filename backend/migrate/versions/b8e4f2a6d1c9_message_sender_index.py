@@ -0,0 +1,30 @@
+"""message sender index
+
+Revision ID: b8e4f2a6d1c9
+Revises: a3d6e9b2c4f1
+Create Date: 2026-10-18 18:42:37.160228
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e4f2a6d1c9'
+down_revision: Union[str, Sequence[str], None] = 'a3d6e9b2c4f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The user's export finds conversations through what they sent
+    op.create_index('idx_message_sender_conv', 'message', ['sender_user_id', 'conv_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_message_sender_conv', table_name='message')
@@ -0,0 +1,43 @@
+"""media uploaders
+
+Revision ID: c5f1a8d3e7b4
+Revises: b8e4f2a6d1c9
+Create Date: 2026-10-18 19:06:51.402815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5f1a8d3e7b4'
+down_revision: Union[str, Sequence[str], None] = 'b8e4f2a6d1c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'media_upload',
+        sa.Column('media_id', sa.Uuid(), nullable=False),
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['media_id'], ['media.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('media_id', 'user_id'),
+    )
+
+    # Existing media: the first uploader is the only one known
+    op.execute(
+        'INSERT INTO media_upload (media_id, user_id, created_at) '
+        'SELECT id, owner_id, created_at FROM media'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('media_upload')
@@ -0,0 +1,70 @@
+"""message seq
+
+Revision ID: d2a7c4f19e36
+Revises: 5b9d0e7f3a21
+Create Date: 2026-10-18 11:20:44.901532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a7c4f19e36'
+down_revision: Union[str, Sequence[str], None] = '5b9d0e7f3a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('message', sa.Column('seq', sa.BigInteger(), nullable=True))
+    op.add_column('conversation', sa.Column('last_seq', sa.BigInteger(), server_default='0', nullable=False))
+    op.add_column('convreadstate', sa.Column('read_seq', sa.BigInteger(), server_default='0', nullable=False))
+
+    # Number existing history in send order
+    op.execute(
+        """
+        UPDATE message m
+        SET seq = numbered.seq
+        FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY conv_id ORDER BY created_at, id
+            ) AS seq
+            FROM message
+        ) numbered
+        WHERE m.id = numbered.id
+        """
+    )
+    op.execute(
+        """
+        UPDATE conversation c
+        SET last_seq = latest.last_seq
+        FROM (
+            SELECT conv_id, max(seq) AS last_seq FROM message GROUP BY conv_id
+        ) latest
+        WHERE c.id = latest.conv_id
+        """
+    )
+    op.execute(
+        """
+        UPDATE convreadstate r
+        SET read_seq = m.seq
+        FROM message m
+        WHERE m.id = r.last_message_id
+        """
+    )
+
+    op.alter_column('message', 'seq', nullable=False)
+    op.create_index('idx_message_conv_seq', 'message', ['conv_id', 'seq'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_message_conv_seq', table_name='message')
+    op.drop_column('convreadstate', 'read_seq')
+    op.drop_column('conversation', 'last_seq')
+    op.drop_column('message', 'seq')
@@ -0,0 +1,33 @@
+"""conv read state changed xid
+
+Revision ID: d9a3c6f1b2e8
+Revises: c5f1a8d3e7b4
+Create Date: 2026-10-18 20:14:26.538190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a3c6f1b2e8'
+down_revision: Union[str, Sequence[str], None] = 'c5f1a8d3e7b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Reads no longer touch the other members' user_inbox rows; the changes
+    # feed looks here for them. Existing rows get the migration's xid
+    op.add_column('convreadstate', sa.Column('changed_xid', sa.BigInteger(), server_default=sa.text('pg_current_xact_id()::text::bigint'), nullable=False))
+    op.create_index('idx_convreadstate_changes', 'convreadstate', ['conv_id', 'changed_xid'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_convreadstate_changes', table_name='convreadstate')
+    op.drop_column('convreadstate', 'changed_xid')
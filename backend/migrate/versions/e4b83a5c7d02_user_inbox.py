@@ -0,0 +1,66 @@
+"""user inbox
+
+Revision ID: e4b83a5c7d02
+Revises: d2a7c4f19e36
+Create Date: 2026-10-18 12:03:51.640227
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b83a5c7d02'
+down_revision: Union[str, Sequence[str], None] = 'd2a7c4f19e36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_inbox',
+    sa.Column('user_id', sa.Uuid(), nullable=False),
+    sa.Column('conv_id', sa.Uuid(), nullable=False),
+    sa.Column('last_message_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_message_id', sa.Uuid(), nullable=True),
+    sa.Column('last_sender_id', sa.Uuid(), nullable=True),
+    sa.Column('last_message_preview', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('unread', sa.BigInteger(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['conv_id'], ['conversation.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'conv_id')
+    )
+    op.create_index('idx_user_inbox_keyset', 'user_inbox', ['user_id', 'last_message_at', 'conv_id'], unique=False)
+    op.create_index('idx_user_inbox_conv', 'user_inbox', ['conv_id'], unique=False)
+
+    # Project the existing conversations
+    op.execute(
+        """
+        INSERT INTO user_inbox (
+            user_id, conv_id, last_message_at, last_message_id,
+            last_sender_id, last_message_preview, unread
+        )
+        SELECT
+            p.user_id,
+            c.id,
+            coalesce(c.last_message_at, c.created_at, now()),
+            m.id,
+            m.sender_user_id,
+            left(coalesce(m.content, ''), 200),
+            greatest(c.last_seq - coalesce(r.read_seq, 0), 0)
+        FROM conv_participant p
+        JOIN conversation c ON c.id = p.conv_id
+        LEFT JOIN message m ON m.id = c.last_message_id
+        LEFT JOIN convreadstate r ON r.conv_id = p.conv_id AND r.user_id = p.user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_user_inbox_conv', table_name='user_inbox')
+    op.drop_index('idx_user_inbox_keyset', table_name='user_inbox')
+    op.drop_table('user_inbox')
@@ -0,0 +1,33 @@
+"""user inbox changed_xid
+
+Revision ID: f19c6d2b8a47
+Revises: e4b83a5c7d02
+Create Date: 2026-10-18 12:48:09.315870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f19c6d2b8a47'
+down_revision: Union[str, Sequence[str], None] = 'e4b83a5c7d02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows get the migration's xid, so clients holding an older
+    # watermark simply receive everything once
+    op.add_column('user_inbox', sa.Column('changed_xid', sa.BigInteger(), server_default=sa.text('pg_current_xact_id()::text::bigint'), nullable=False))
+    op.create_index('idx_user_inbox_changes', 'user_inbox', ['user_id', 'changed_xid'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_user_inbox_changes', table_name='user_inbox')
+    op.drop_column('user_inbox', 'changed_xid')
@@ -9,8 +9,11 @@ interface FetchMessageProps {
 const pageLimit = 50;
 
 export const chatService = {
-  async fetchConversations(): Promise<ConversationResponse> {
-    const res = await api.get("/conversations/");
+  // One page of the inbox, newest first; pass nextCursor for the next one
+  async fetchConversations(cursor?: string): Promise<ConversationResponse> {
+    const res = await api.get("/conversations/", {
+      params: cursor ? { cursor } : {},
+    });
     return res.data;
   },
 
@@ -26,8 +26,26 @@ export const useChatStore = create<ChatState>()(
       fetchConversations: async () => {
         try {
           set({ convoLoading: true });
-          const { conversations } = await chatService.fetchConversations();
+          const { conversations, nextCursor } =
+            await chatService.fetchConversations();
           set({ conversations, convoLoading: false });
+
+          // The first page shows right away, the rest is appended as it comes
+          let cursor = nextCursor;
+          while (cursor) {
+            const page = await chatService.fetchConversations(cursor);
+            set((state) => {
+              // A conversation that moved up meanwhile is already listed
+              const seen = new Set(state.conversations.map((c) => c._id));
+              return {
+                conversations: [
+                  ...state.conversations,
+                  ...page.conversations.filter((c) => !seen.has(c._id)),
+                ],
+              };
+            });
+            cursor = page.nextCursor;
+          }
         } catch (error) {
           console.error("Occurred during fetching conversations:", error);
           set({ convoLoading: false });
@@ -26,6 +26,10 @@ export const useSocketStore = create<SocketState>((set, get) => ({
       console.log("RAW:", event.data);
       const data = JSON.parse(event.data);
 
+      if (data.type === "presence_snapshot") {
+        set({ onlineUsers: data.online });
+      }
+
       if (data.type === "presence") {
         const { client_id, status } = data;
 
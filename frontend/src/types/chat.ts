@@ -31,9 +31,11 @@ export interface Conversation {
   _id: string;
   type: "direct" | "group";
   group: Group;
-  participants: Participant[];
+  participants: Participant[]; // receipts=compact: caller, last sender and first readers only
+  memberCount?: number | null; // receipts=compact: total members
   lastMessageAt: string;
   seenBy: SeenUser[];
+  seenCount?: number | null; // receipts=compact: total readers, seenBy holds the first few
   lastMessage: LastMessage | null;
   unreadCounts: Record<string, number>; // key = userId, value = unread count
   createdAt: string;
@@ -42,6 +44,7 @@ export interface Conversation {
 
 export interface ConversationResponse {
   conversations: Conversation[];
+  nextCursor?: string | null;
 }
 
 export interface Message {
@@ -50,6 +53,9 @@ export interface Message {
   senderId: string;
   content: string | null;
   imgUrl?: string | null;
+  mediaId?: string | null;
+  // Resized variant URLs (thumb, small, medium, large) of an uploaded image
+  media?: Record<string, string> | null;
   updatedAt?: string | null;
   createdAt: string;
   isOwn?: boolean;